@@ -10,10 +10,18 @@ def create_app():
     app.config.from_object('app.config.Config')  # Ensure this points to the correct config class
 
     # Register blueprints
-    from app.routes.graph import graph_bp
+    from app.routes.graph import graph_bp, remove_stale_graph_files
     from app.routes.chat_routes import chat_routes
 
     app.register_blueprint(graph_bp, url_prefix="/api/graph")
     app.register_blueprint(chat_routes, url_prefix="/api/chat")
 
+    # Workspace files left by exited processes may not match the graphs rebuilt from the paper store
+    remove_stale_graph_files()
+
+    # Models load lazily on first use; optionally start loading them in the background now
+    from app import registry
+    if registry.WARM_UP_MODELS:
+        registry.warm_up()
+
     return app
@@ -0,0 +1,115 @@
+import os
+import time
+import itertools
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Minimum cosine similarity between two queries for them to share an answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# Seconds a cached answer stays valid
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# Total number of cached answers across all documents
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+
+class CachedAnswer:
+    def __init__(self, doc_id, query, vector, answer, chunk_ids, expires_at, context=None, variant=None):
+        self.doc_id = doc_id
+        self.query = query
+        self.vector = vector
+        self.answer = answer
+        self.chunk_ids = chunk_ids
+        self.expires_at = expires_at
+        self.context = context
+        self.variant = variant
+
+
+class SemanticAnswerCache:
+    """Answers keyed by document and query embedding, matched by cosine similarity.
+
+    Rephrasings of an earlier question about the same paper reuse its answer
+    instead of paying for retrieval and another LLM call. ``variant`` holds
+    the retrieval settings an answer was produced with; answers are only
+    shared between requests with the same variant.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # entry key -> CachedAnswer, least recently used first
+        self._by_document = {}  # doc_id -> set of entry keys
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, doc_id, query_embedding, variant=None):
+        """Returns the closest cached answer above the similarity threshold, or None."""
+        query = self._normalize(query_embedding)
+        now = time.time()
+        with self._lock:
+            keys = [
+                key for key in list(self._by_document.get(doc_id, ()))
+                if self._evict_if_expired(key, now) and self._entries[key].variant == variant
+            ]
+            if keys:
+                vectors = np.vstack([self._entries[key].vector for key in keys])
+                similarities = vectors @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]]
+            self.misses += 1
+            return None
+
+    def store(self, doc_id, query, query_embedding, answer, chunk_ids, context=None, variant=None):
+        with self._lock:
+            key = next(self._keys)
+            self._entries[key] = CachedAnswer(
+                doc_id, query, self._normalize(query_embedding), answer, chunk_ids, time.time() + self.ttl,
+                context, variant
+            )
+            self._by_document.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, doc_id):
+        """Drops every cached answer for a document, e.g. when it is re-processed."""
+        with self._lock:
+            for key in list(self._by_document.get(doc_id, ())):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _evict_if_expired(self, key, now):
+        """Returns True if the entry is still live, removing it otherwise."""
+        if self._entries[key].expires_at > now:
+            return True
+        self._remove(key)
+        return False
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        keys = self._by_document.get(entry.doc_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_document[entry.doc_id]
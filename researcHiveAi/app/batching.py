@@ -0,0 +1,68 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+# Largest batch handed to the model or index in one call
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
+# How long the first request of a batch waits for others to join it
+QUERY_BATCH_MAX_WAIT_MS = float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+    """Groups calls arriving within a few milliseconds into one batched call.
+
+    ``batch_fn`` receives a list of submitted items and must return one result
+    per item, in the same order. Each caller blocks until its own result is ready;
+    a result that is an exception instance is raised in that caller only.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=QUERY_BATCH_MAX_SIZE,
+                 max_wait_ms=QUERY_BATCH_MAX_WAIT_MS, name="micro-batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queues an item and waits for its result, re-raising any batch error."""
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # The worker must outlive any batch: a dead worker would leave every later caller waiting
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"{self._worker.name}: batch function returned {len(results)} results for {len(batch)} items"
+                    )
+            except BaseException as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
@@ -0,0 +1,75 @@
+import re
+from collections import Counter
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Constant in reciprocal rank fusion; 60 is the value from the original RRF paper
+RRF_K = 60
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Array-backed inverted index with precomputed BM25 term weights.
+
+    Postings are stored term by term in flat numpy arrays, so scoring a query
+    is one gather plus one ``np.bincount`` over the postings of its terms.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.num_docs = len(chunks)
+        self.vocabulary = {}
+        term_ids, doc_ids, term_freqs = [], [], []
+        doc_lengths = np.zeros(self.num_docs, dtype=np.float32)
+
+        for doc_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            doc_lengths[doc_id] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc_id)
+                term_freqs.append(freq)
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        term_freqs = np.asarray(term_freqs, dtype=np.float32)
+
+        # Group postings by term: postings of term t live in [offsets[t], offsets[t + 1])
+        order = np.argsort(term_ids, kind="stable")
+        doc_freqs = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate(([0], np.cumsum(doc_freqs))).astype(np.int64)
+        self.postings = doc_ids[order]
+
+        avg_length = doc_lengths.mean() if self.num_docs else 0.0
+        idf = np.log(1 + (self.num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5)).astype(np.float32)
+        tf = term_freqs[order]
+        norm = k1 * (1 - b + b * doc_lengths[self.postings] / max(avg_length, 1e-9))
+        self.weights = (idf[term_ids[order]] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def scores(self, query):
+        """BM25 score of every chunk for the query."""
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        positions = np.concatenate([np.arange(self.offsets[t], self.offsets[t + 1]) for t in term_ids])
+        return np.bincount(self.postings[positions], weights=self.weights[positions], minlength=self.num_docs)
+
+    def search(self, query, k):
+        """Ids of the ``k`` best-scoring chunks that share at least one term with the query."""
+        scores = self.scores(query)
+        matching = np.flatnonzero(scores)
+        if len(matching) > k:
+            matching = matching[np.argpartition(-scores[matching], k - 1)[:k]]
+        return [int(i) for i in matching[np.argsort(-scores[matching])]]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=RRF_K):
+    """Fuses several ranked id lists, scoring each id by the sum of 1 / (rrf_k + rank)."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused, key=fused.get, reverse=True)[:k]
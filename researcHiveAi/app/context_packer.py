@@ -0,0 +1,110 @@
+import os
+import re
+
+# Upper bound on the estimated prompt tokens spent on document context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# Spans whose word sets overlap at least this much with a kept span are dropped
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+# Longest overlap searched for when stitching neighbouring chunks (chunk_overlap is 200)
+MAX_STITCH_OVERLAP = 400
+# Shorter suffix/prefix matches are coincidence rather than splitter overlap
+MIN_STITCH_OVERLAP = 32
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text) + 3) // 4
+
+
+def _on_word_boundaries(left, right, size):
+    """True when the overlap starts and ends between words in both chunks."""
+    starts = size == len(left) or left[-size - 1].isspace() or right[0].isspace()
+    ends = size == len(right) or right[size].isspace() or right[size - 1].isspace()
+    return starts and ends
+
+
+def overlap_size(left, right, max_overlap=MAX_STITCH_OVERLAP, min_overlap=MIN_STITCH_OVERLAP):
+    """Length of the text ``right`` repeats from the end of ``left``, or 0 if they do not overlap.
+
+    Only overlaps of at least ``min_overlap`` characters that fall on word
+    boundaries count; shorter matches are coincidence.
+    """
+    for size in range(min(max_overlap, len(left), len(right)), max(min_overlap, 1) - 1, -1):
+        if left.endswith(right[:size]) and _on_word_boundaries(left, right, size):
+            return size
+    return 0
+
+
+def stitch(left, right, max_overlap=MAX_STITCH_OVERLAP, min_overlap=MIN_STITCH_OVERLAP):
+    """Joins two consecutive chunks, writing their shared overlap only once.
+
+    Chunks without a real overlap are joined with a paragraph break.
+    """
+    size = overlap_size(left, right, max_overlap, min_overlap)
+    if size:
+        return left + right[size:]
+    return left + "\n\n" + right
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def pack_context(chunk_ids, chunks, token_budget=CONTEXT_TOKEN_BUDGET):
+    """Turns ranked chunk ids into the text sections sent to the LLM.
+
+    Chunks are added in relevance order until the token budget is spent,
+    skipping near-duplicates and not paying again for text a kept neighbour
+    already covers. The kept chunks are then stitched into contiguous spans
+    and returned in document order along with token statistics: overlap and
+    duplicates removed count as ``tokens_saved``, chunks dropped or trimmed
+    to fit the budget as ``tokens_over_budget``.
+    """
+    ranked = [i for i in dict.fromkeys(chunk_ids) if 0 <= i < len(chunks)]
+    tokens_retrieved = sum(estimate_tokens(chunks[i]) for i in ranked)
+
+    kept, kept_words, used, duplicates, over_budget = {}, [], 0, 0, 0
+    for chunk_id in ranked:
+        text = chunks[chunk_id]
+        words = set(WORD_PATTERN.findall(text.lower()))
+        if any(_jaccard(words, other) >= NEAR_DUPLICATE_THRESHOLD for other in kept_words):
+            duplicates += 1
+            continue
+        # Only the text not already covered by kept neighbours costs tokens
+        start = overlap_size(kept[chunk_id - 1], text) if chunk_id - 1 in kept else 0
+        end = len(text) - overlap_size(text, kept[chunk_id + 1]) if chunk_id + 1 in kept else len(text)
+        tokens = estimate_tokens(text[start:max(start, end)])
+        if used + tokens > token_budget:
+            if kept:
+                over_budget += estimate_tokens(text)
+                continue
+            # Always send something: trim the most relevant chunk to the budget
+            text = text[:token_budget * 4]
+            tokens = estimate_tokens(text)
+            over_budget += estimate_tokens(chunks[chunk_id]) - tokens
+        kept[chunk_id] = text
+        kept_words.append(words)
+        used += tokens
+
+    # Merge consecutive kept chunks into spans, in document order
+    spans, previous = [], None
+    for chunk_id in sorted(kept):
+        if previous is not None and chunk_id == previous + 1:
+            spans[-1] = stitch(spans[-1], kept[chunk_id])
+        else:
+            spans.append(kept[chunk_id])
+        previous = chunk_id
+
+    stats = {
+        "tokens_retrieved": tokens_retrieved,
+        "tokens_packed": used,
+        "tokens_saved": tokens_retrieved - used - over_budget,
+        "tokens_over_budget": over_budget,
+        "spans": len(spans),
+        "near_duplicates_dropped": duplicates,
+    }
+    return spans, stats
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import faiss
+import numpy as np
+from app.faiss_index import search_params
+from app.bm25 import BM25Index
+
+# Root folder for processed papers, one sub-folder per document id
+DOCUMENT_STORE_DIR = os.getenv(
+    "DOCUMENT_STORE_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "documents")
+)
+
+PDF_FILE = "paper.pdf"
+INDEX_FILE = "index.faiss"
+CHUNKS_FILE = "chunks.json"
+META_FILE = "meta.json"
+LATEST_FILE = "LATEST"
+
+# Complete snapshots kept in memory per worker; older ones are reloaded from disk on demand
+DOCUMENT_CACHE_SIZE = max(1, int(os.getenv("DOCUMENT_CACHE_SIZE", "16")))
+
+DOCUMENT_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class Document:
+    """Immutable snapshot of a processed paper: its FAISS index, text chunks and metadata.
+
+    Snapshots are never modified after they are published. Ingestion builds the
+    next snapshot off to the side and the store swaps it in atomically, so a
+    query keeps working against the snapshot it started with. While a paper is
+    still being ingested the published snapshot is ``complete=False``.
+    """
+
+    def __init__(self, doc_id, index, chunks, metadata, complete=True):
+        self.doc_id = doc_id
+        self.index = index
+        self.chunks = tuple(chunks)
+        self.metadata = metadata
+        self.complete = complete
+        self.lexical_index = BM25Index(self.chunks) if complete else None
+
+    def search_many(self, query_embeddings, k, nprobe=None, ef_search=None):
+        """Searches several query embeddings in one FAISS call, returning chunk ids per query."""
+        query = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if self.index.ntotal == 0:
+            return [[] for _ in range(len(query))]
+        params = search_params(self.index, nprobe, ef_search)
+        if params is None:
+            distances, indices = self.index.search(query, k)
+        else:
+            distances, indices = self.index.search(query, k, params=params)
+        return [[int(i) for i in row if 0 <= i < len(self.chunks)] for row in indices]
+
+
+class DocumentStore:
+    """Registry of processed papers keyed by the SHA-256 of the PDF bytes.
+
+    Each paper is persisted to ``<root>/<doc_id>/`` and loaded lazily on
+    first use, so a restarted worker can serve it without re-embedding.
+    At most ``max_documents`` complete snapshots stay in memory, evicted in
+    least recently used order; partial snapshots of papers still being
+    ingested are kept until their ingestion finishes or fails.
+    """
+
+    def __init__(self, root=DOCUMENT_STORE_DIR, max_documents=DOCUMENT_CACHE_SIZE):
+        self.root = root
+        self.max_documents = max_documents
+        os.makedirs(self.root, exist_ok=True)
+        self._documents = OrderedDict()
+        self._partial = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_valid_id(doc_id):
+        return isinstance(doc_id, str) and bool(DOCUMENT_ID_PATTERN.match(doc_id))
+
+    def _path(self, doc_id, name):
+        return os.path.join(self.root, doc_id, name)
+
+    def pdf_path(self, doc_id):
+        return self._path(doc_id, PDF_FILE)
+
+    def has_pdf(self, doc_id):
+        return self.is_valid_id(doc_id) and os.path.exists(self.pdf_path(doc_id))
+
+    def is_processed(self, doc_id):
+        """A document is complete once its metadata file has been written."""
+        return self.is_valid_id(doc_id) and os.path.exists(self._path(doc_id, META_FILE))
+
+    def save_pdf(self, data):
+        """Stores the raw PDF bytes and returns the content-hash document id."""
+        doc_id = hashlib.sha256(data).hexdigest()
+        os.makedirs(os.path.join(self.root, doc_id), exist_ok=True)
+        if not os.path.exists(self.pdf_path(doc_id)):
+            self._write_atomic(self.pdf_path(doc_id), data)
+        return doc_id
+
+    def publish_partial(self, document):
+        """Publishes a snapshot of a paper that is still being ingested.
+
+        A complete snapshot is never replaced by a partial one, so rebuilding a
+        paper keeps serving the previous version until the new one is saved.
+        """
+        with self._lock:
+            if document.doc_id not in self._documents:
+                self._partial[document.doc_id] = document
+
+    def discard(self, doc_id):
+        """Forgets the partial snapshot of a paper whose ingestion failed."""
+        with self._lock:
+            self._partial.pop(doc_id, None)
+
+    def save(self, document):
+        """Persists a complete snapshot, then swaps it in as the served version.
+
+        The metadata file is written last and marks the document as processed.
+        """
+        doc_id = document.doc_id
+        os.makedirs(os.path.join(self.root, doc_id), exist_ok=True)
+        index_path = self._path(doc_id, INDEX_FILE)
+        faiss.write_index(document.index, index_path + ".tmp")
+        os.replace(index_path + ".tmp", index_path)
+        self._write_atomic(self._path(doc_id, CHUNKS_FILE), json.dumps(list(document.chunks)).encode("utf-8"))
+        self._write_atomic(self._path(doc_id, META_FILE), json.dumps(document.metadata).encode("utf-8"))
+
+        with self._lock:
+            self._partial.pop(doc_id, None)
+            self._cache(document)
+
+    def _cache(self, document):
+        self._documents[document.doc_id] = document
+        self._documents.move_to_end(document.doc_id)
+        while len(self._documents) > self.max_documents:
+            self._documents.popitem(last=False)
+
+    def get(self, doc_id):
+        """Returns the current snapshot of a document, loading it from disk on first access.
+
+        Papers that are still being ingested return their latest partial snapshot;
+        unknown documents return None.
+        """
+        if not self.is_valid_id(doc_id):
+            return None
+
+        with self._lock:
+            document = self._documents.get(doc_id)
+            if document is not None:
+                self._documents.move_to_end(doc_id)
+            elif self.is_processed(doc_id):
+                document = self._load(doc_id)
+                self._cache(document)
+            else:
+                document = self._partial.get(doc_id)
+        return document
+
+    def _load(self, doc_id):
+        index = self._read_index(self._path(doc_id, INDEX_FILE))
+        with open(self._path(doc_id, CHUNKS_FILE), "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        with open(self._path(doc_id, META_FILE), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        return Document(doc_id, index, chunks, metadata)
+
+    @staticmethod
+    def _read_index(path):
+        """Memory-maps the index where the FAISS index type supports it."""
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        try:
+            return faiss.read_index(path, mmap_flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            return faiss.read_index(path)
+
+    def latest(self):
+        """Returns the id of the most recently uploaded document, if any."""
+        try:
+            with open(os.path.join(self.root, LATEST_FILE), "r") as f:
+                doc_id = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return doc_id if self.is_valid_id(doc_id) else None
+
+    def set_latest(self, doc_id):
+        self._write_atomic(os.path.join(self.root, LATEST_FILE), doc_id.encode("ascii"))
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
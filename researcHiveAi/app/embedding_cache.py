@@ -0,0 +1,62 @@
+import os
+import time
+import hashlib
+import numpy as np
+
+from app.sqlite_lru import SQLiteLRU
+
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "embedding_cache.sqlite3")
+)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Stay well below SQLite's limit on bound parameters per statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """On-disk LRU cache mapping (embedding model, chunk text) to its vector.
+
+    Re-uploading a revised paper only needs to encode the chunks whose text
+    actually changed; everything else is served from this cache.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._store = SQLiteLRU(path, "embeddings", "vector BLOB NOT NULL")
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name, texts):
+        """Returns one vector per text, with None for cache misses."""
+        keys = [self.key(model_name, text) for text in texts]
+        found = {}
+        with self._store.write() as conn:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                self._store.touch(conn, batch)
+        return [np.frombuffer(found[k], dtype=np.float32) if k in found else None for k in keys]
+
+    def put_many(self, model_name, texts, vectors):
+        """Stores vectors for the given texts and evicts the least recently used overflow."""
+        now = time.time()
+        rows = [
+            (self.key(model_name, text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._store.write() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows)
+            self._store.evict_to_count(conn, self.max_entries)
+
+    def __len__(self):
+        with self._store.read() as conn:
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
@@ -0,0 +1,268 @@
+"""Local embedding service shared by every Flask and Streamlit worker.
+
+One process owns the embedding model and batches the requests of all its
+clients together. Clients talk to it over a Unix socket or localhost TCP
+with a compact binary protocol (all integers are big-endian uint32):
+
+    request:  b"EMB1" | count | count x (length | utf-8 bytes)
+    response: rows | dim | rows * dim float32 (little-endian)
+    error:    0xFFFFFFFF | length | utf-8 message
+
+    info request:  b"INF1"
+    info response: dim | length | utf-8 model id
+
+The model id names the vectors the service produces (see
+``app.embeddings.embedding_model_id``), so clients key their embedding
+caches on what the service actually runs rather than on their own settings.
+
+Run it with:
+    python -m app.embedding_server --address unix:///tmp/researchive-embed.sock
+and point clients at it with EMBEDDING_BACKEND=remote and
+EMBEDDING_SERVICE_ADDRESS set to the same address.
+"""
+import os
+import socket
+import time
+import struct
+import argparse
+import threading
+import socketserver
+import numpy as np
+
+from app.embeddings import EMBEDDING_SERVER_BACKEND, embedding_model_id, load_embedding_model
+
+EMBEDDING_SERVICE_ADDRESS = os.getenv("EMBEDDING_SERVICE_ADDRESS", "unix:///tmp/researchive-embed.sock")
+# Requests from different clients merged into one encode call, and how long to wait for them
+EMBEDDING_SERVER_MAX_BATCH = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "64"))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "5"))
+# Pending connections the listening socket accepts before clients are refused
+EMBEDDING_SERVER_BACKLOG = int(os.getenv("EMBEDDING_SERVER_BACKLOG", "256"))
+# Client attempts per request and the first retry delay (doubled each time, capped at 1s)
+EMBEDDING_CLIENT_ATTEMPTS = int(os.getenv("EMBEDDING_CLIENT_ATTEMPTS", "6"))
+EMBEDDING_CLIENT_BACKOFF = float(os.getenv("EMBEDDING_CLIENT_BACKOFF", "0.02"))
+
+MAGIC = b"EMB1"
+INFO_MAGIC = b"INF1"
+ERROR = 0xFFFFFFFF
+_UINT = struct.Struct("!I")
+_PAIR = struct.Struct("!II")
+
+
+def parse_address(address):
+    """Returns ``(socket family, address)`` for ``unix:///path``, ``tcp://host:port`` or ``host:port``."""
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    host, _, port = address.replace("tcp://", "", 1).rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Embedding service connection closed")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def encode_request(texts):
+    parts = [MAGIC, _UINT.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_UINT.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def read_request(sock):
+    """Returns the texts of an embedding request, or ``None`` for an info request."""
+    magic = _recv_exact(sock, len(MAGIC))
+    if magic == INFO_MAGIC:
+        return None
+    if magic != MAGIC:
+        raise ValueError("Bad embedding request header")
+    count = _UINT.unpack(_recv_exact(sock, _UINT.size))[0]
+    texts = []
+    for _ in range(count):
+        length = _UINT.unpack(_recv_exact(sock, _UINT.size))[0]
+        texts.append(_recv_exact(sock, length).decode("utf-8"))
+    return texts
+
+
+def encode_response(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    return _PAIR.pack(*vectors.shape) + vectors.tobytes()
+
+
+def encode_info(dimension, model_id):
+    data = model_id.encode("utf-8")
+    return _PAIR.pack(dimension, len(data)) + data
+
+
+def read_info(sock):
+    dimension, length = _PAIR.unpack(_recv_exact(sock, _PAIR.size))
+    if dimension == ERROR:
+        raise RuntimeError(f"Embedding service error: {_recv_exact(sock, length).decode('utf-8')}")
+    return _recv_exact(sock, length).decode("utf-8"), dimension
+
+
+def encode_error(message):
+    data = message.encode("utf-8")
+    return _PAIR.pack(ERROR, len(data)) + data
+
+
+def read_response(sock):
+    rows, dim = _PAIR.unpack(_recv_exact(sock, _PAIR.size))
+    if rows == ERROR:
+        raise RuntimeError(f"Embedding service error: {_recv_exact(sock, dim).decode('utf-8')}")
+    return np.frombuffer(_recv_exact(sock, rows * dim * 4), dtype="<f4").reshape(rows, dim).astype(np.float32)
+
+
+class RemoteEmbedder:
+    """Client with the ``SentenceTransformer.encode`` interface backed by the embedding service.
+
+    Each thread keeps its own persistent connection.
+    """
+
+    def __init__(self, address=EMBEDDING_SERVICE_ADDRESS, timeout=60):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+        self._info = None
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            family, address = parse_address(self.address)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(address)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+        # The service may have been restarted with another backend
+        self._info = None
+
+    def _request(self, payload, read):
+        for attempt in range(EMBEDDING_CLIENT_ATTEMPTS):
+            try:
+                sock = self._connection()
+                sock.sendall(payload)
+                return read(sock)
+            except socket.timeout:
+                # A slow service is not helped by sending the same work again
+                self._close()
+                raise
+            except (ConnectionError, OSError):
+                # Refused while the service is busy or restarting; retry on a fresh connection
+                self._close()
+                if attempt == EMBEDDING_CLIENT_ATTEMPTS - 1:
+                    raise
+                time.sleep(min(EMBEDDING_CLIENT_BACKOFF * 2 ** attempt, 1.0))
+
+    def _model_info(self):
+        if self._info is None:
+            self._info = self._request(INFO_MAGIC, read_info)
+        return self._info
+
+    @property
+    def model_id(self):
+        """Id of the model the service runs, for keying embedding caches."""
+        return self._model_info()[0]
+
+    def get_sentence_embedding_dimension(self):
+        return self._model_info()[1]
+
+    def encode(self, sentences, batch_size=256, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        batches = [
+            self._request(encode_request(sentences[i:i + batch_size]), read_response)
+            for i in range(0, len(sentences), batch_size)
+        ]
+        embeddings = np.vstack(batches) if batches else np.empty((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                texts = read_request(self.request)
+            except (ConnectionError, ValueError):
+                return
+            if texts is None:
+                self.request.sendall(encode_info(self.server.dimension, self.server.model_id))
+                continue
+            try:
+                response = encode_response(self.server.batcher.submit(texts))
+            except Exception as e:
+                response = encode_error(str(e))
+            self.request.sendall(response)
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = EMBEDDING_SERVER_BACKLOG
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = EMBEDDING_SERVER_BACKLOG
+
+
+def create_server(address=EMBEDDING_SERVICE_ADDRESS, backend=EMBEDDING_SERVER_BACKEND,
+                  max_batch=EMBEDDING_SERVER_MAX_BATCH, max_wait_ms=EMBEDDING_SERVER_MAX_WAIT_MS):
+    """Loads the model and binds the service; call ``serve_forever()`` on the result."""
+    from app.batching import MicroBatcher
+
+    if backend == "remote":
+        raise ValueError("The embedding service needs a local backend, not 'remote'")
+    model = load_embedding_model(backend, device="cpu")
+
+    def encode_batch(requests):
+        # One forward pass for the texts of every client request in the batch
+        texts = [text for request in requests for text in request]
+        vectors = np.asarray(model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+        results, start = [], 0
+        for request in requests:
+            results.append(vectors[start:start + len(request)])
+            start += len(request)
+        return results
+
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.remove(bind_address)
+        server = _UnixServer(bind_address, _Handler)
+    else:
+        server = _TCPServer(bind_address, _Handler)
+    server.batcher = MicroBatcher(encode_batch, max_batch, max_wait_ms, name="embedding-service")
+    server.model_id = embedding_model_id(backend)
+    server.dimension = model.get_sentence_embedding_dimension()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding service")
+    parser.add_argument("--address", default=EMBEDDING_SERVICE_ADDRESS)
+    parser.add_argument("--backend", default=EMBEDDING_SERVER_BACKEND)
+    parser.add_argument("--max-batch", type=int, default=EMBEDDING_SERVER_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=EMBEDDING_SERVER_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    server = create_server(args.address, args.backend, args.max_batch, args.max_wait_ms)
+    print(f"Embedding service ({args.backend}) listening on {args.address}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+
+# Sentence embedding model shared by chat retrieval and the knowledge graph
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# torch (SentenceTransformer), onnx (ONNX Runtime, fp32), onnx-int8 (dynamically quantized)
+# or remote (the shared embedding service in app.embedding_server)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+ONNX_MODEL_DIR = os.getenv(
+    "ONNX_MODEL_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "data", "onnx")
+)
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+# Backend the embedding service runs unless started with --backend
+EMBEDDING_SERVER_BACKEND = os.getenv("EMBEDDING_SERVER_BACKEND", "torch")
+
+
+def export_onnx_model(model_name=EMBEDDING_MODEL_NAME, model_dir=ONNX_MODEL_DIR, quantize=False):
+    """Exports the transformer to ONNX once (and its int8 variant if asked) and returns the file path."""
+    target_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+    fp32_path = os.path.join(target_dir, "model.onnx")
+    int8_path = os.path.join(target_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        os.makedirs(target_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name).eval()
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask", "token_type_ids"]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                fp32_path + ".tmp",
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14,
+            )
+        os.replace(fp32_path + ".tmp", fp32_path)
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, int8_path + ".tmp", weight_type=QuantType.QInt8)
+        os.replace(int8_path + ".tmp", int8_path)
+    return int8_path
+
+
+class OnnxEmbedder:
+    """ONNX Runtime replacement for ``SentenceTransformer.encode`` on CPU.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (mean pooling over the attention
+    mask, then L2 normalisation), so its vectors can be mixed with the ones in
+    existing indexes.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL_NAME, quantize=False, model_dir=ONNX_MODEL_DIR,
+                 max_seq_length=256, normalize=True):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        self.normalize = normalize
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            export_onnx_model(model_name, model_dir, quantize), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dimension = None
+
+    def get_sentence_embedding_dimension(self):
+        if self._dimension is None:
+            self._dimension = self.encode(["dimension probe"]).shape[1]
+        return self._dimension
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, show_progress_bar=False, **kwargs):
+        """Encodes a string or list of strings, mirroring ``SentenceTransformer.encode``."""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        # Batch similar lengths together to minimise padding, then restore the input order
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        embeddings = np.empty((len(sentences), 0), dtype=np.float32)
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = [sentences[i] for i in order[start:start + batch_size]]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            feed = {name: tokens[name].astype(np.int64) for name in self._input_names if name in tokens}
+            hidden = self.session.run(None, feed)[0]
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled)
+
+        if batches:
+            embeddings = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+            embeddings[order] = np.vstack(batches)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+
+def load_embedding_model(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL_NAME, device=None):
+    """Loads the embedding model on the configured backend."""
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device=device)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbedder(model_name, quantize=backend == "onnx-int8")
+    if backend == "remote":
+        from app.embedding_server import RemoteEmbedder
+        return RemoteEmbedder()
+    raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBEDDING_BACKENDS + ('remote',)}")
+
+
+def embedding_model_id(backend=EMBEDDING_BACKEND, model_name=EMBEDDING_MODEL_NAME, model=None):
+    """Identifies the vectors a backend produces, e.g. for keying embedding caches.
+
+    Remote vectors are identified by the embedding service itself, through
+    ``model`` (a ``RemoteEmbedder``) when one is given.
+    """
+    if backend == "remote":
+        if model is None:
+            from app.embedding_server import RemoteEmbedder
+            model = RemoteEmbedder()
+        return model.model_id
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+def cosine_drift(reference, candidate):
+    """Per-row ``1 - cosine similarity`` between two embedding matrices."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    dots = (reference * candidate).sum(axis=1)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return 1 - dots / np.clip(norms, 1e-12, None)
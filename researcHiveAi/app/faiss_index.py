@@ -0,0 +1,112 @@
+import os
+import math
+import faiss
+import numpy as np
+
+# Index type for new documents: flat, ivf_flat, hnsw or ivf_pq
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# Upper bound on IVF inverted lists; shrunk automatically for small corpora
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "1024"))
+# Neighbours per node in the HNSW graph
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+# Sub-quantizers per vector for IVF-PQ (at most; the largest divisor of the dimension is used);
+# 96 keeps 4 dimensions per 8-bit code for 384-d embeddings
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "96"))
+# IVF-PQ candidates re-ranked per result against 8-bit scalar-quantized vectors
+FAISS_REFINE_K_FACTOR = int(os.getenv("FAISS_REFINE_K_FACTOR", "4"))
+# Vectors collected before training IVF indexes
+FAISS_TRAIN_SAMPLE_SIZE = int(os.getenv("FAISS_TRAIN_SAMPLE_SIZE", "20000"))
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq")
+
+# FAISS recommends at least this many training points per IVF centroid
+_POINTS_PER_CENTROID = 39
+# Smallest training sets that give each index type useful clusters: 64 inverted lists
+# for IVF-Flat, and full 256-centroid (8-bit) PQ codebooks for IVF-PQ
+MIN_TRAINING_VECTORS = {
+    "ivf_flat": 64 * _POINTS_PER_CENTROID,
+    "ivf_pq": 256 * _POINTS_PER_CENTROID,
+}
+
+
+def needs_training(index_type):
+    return index_type in TRAINED_INDEX_TYPES
+
+
+def fallback_index_type(index_type, num_vectors):
+    """Returns the index type to build for ``num_vectors`` vectors.
+
+    Trained index types fall back to IVF-Flat, then Flat, when there are too
+    few vectors to train them well; a typical paper has only a few hundred
+    chunks, which Flat search handles exactly and quickly.
+    """
+    effective = index_type
+    while needs_training(effective) and num_vectors < MIN_TRAINING_VECTORS[effective]:
+        effective = "ivf_flat" if effective == "ivf_pq" else "flat"
+    if effective != index_type:
+        print(f"Building a {effective} index instead of {index_type} for {num_vectors} vectors "
+              f"(needs at least {MIN_TRAINING_VECTORS[index_type]})")
+    return effective
+
+
+def create_index(index_type, dimension, num_vectors=None):
+    """Creates an empty index of the given type.
+
+    ``num_vectors`` is the size of the training sample and is used to pick
+    ``nlist`` and the PQ code size for trained index types.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}', expected one of {INDEX_TYPES}")
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dimension, FAISS_HNSW_M)
+
+    num_vectors = num_vectors or FAISS_TRAIN_SAMPLE_SIZE
+    nlist = max(1, min(FAISS_NLIST, num_vectors // _POINTS_PER_CENTROID))
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    else:
+        # Largest sub-quantizer count up to FAISS_PQ_M that divides the dimension
+        pq_m = max(m for m in range(1, FAISS_PQ_M + 1) if dimension % m == 0)
+        # Each sub-quantizer has 2**nbits centroids, which also want ~39 points each
+        nbits = max(1, min(8, int(math.log2(max(num_vectors // _POINTS_PER_CENTROID, 2)))))
+        base = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, nbits)
+        # PQ distances alone rank neighbours poorly; re-rank the shortlist with finer codes
+        index = faiss.IndexRefine(base, faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit))
+        index.k_factor = FAISS_REFINE_K_FACTOR
+    return index
+
+
+def train_index(index_type, vectors):
+    """Builds an index of the given type, training it on ``vectors`` and adding them.
+
+    Falls back to a simpler index type when there are too few vectors to train on.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    index_type = fallback_index_type(index_type, len(vectors))
+    index = create_index(index_type, vectors.shape[1], len(vectors))
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def search_params(index, nprobe=None, ef_search=None):
+    """Per-query search parameters for the index, so concurrent requests can use different settings.
+
+    Knobs that do not apply to the index type are ignored.
+    """
+    if isinstance(index, faiss.IndexRefine):
+        base_params = search_params(faiss.downcast_index(index.base_index), nprobe, ef_search)
+        if base_params is None:
+            return None
+        return faiss.IndexRefineSearchParameters(k_factor=index.k_factor, base_index_params=base_params)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe))
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search))
+    return None
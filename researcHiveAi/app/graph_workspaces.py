@@ -0,0 +1,131 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Total nodes + edges kept across all in-memory graph workspaces
+GRAPH_WORKSPACE_MAX_ELEMENTS = int(os.getenv("GRAPH_WORKSPACE_MAX_ELEMENTS", "200000"))
+# Build recipes remembered for evicted workspaces so they can be rebuilt on demand
+GRAPH_WORKSPACE_MAX_RECIPES = int(os.getenv("GRAPH_WORKSPACE_MAX_RECIPES", "10000"))
+
+
+def workspace_id(query, max_results):
+    """Stable id of the workspace for a query, ignoring case and extra whitespace."""
+    normalized = " ".join(query.lower().split())
+    return hashlib.sha256(f"{normalized}\0{int(max_results)}".encode("utf-8")).hexdigest()[:16]
+
+
+class GraphWorkspaces:
+    """Named knowledge graphs in an LRU bounded by their total node and edge count.
+
+    Each workspace remembers the ``(query, max_results)`` steps it was built
+    from; an evicted workspace is rebuilt from them the next time it is asked
+    for. ``build(workspace_id, steps)`` returns a new graph object and
+    ``on_evict(graph)`` is called for every graph dropped from memory, after
+    the workspace and graph locks have been released, so it may take the
+    evicted graph's own lock. Graph objects carry a ``lock`` that is held
+    while a workspace is grown.
+    """
+
+    def __init__(self, build, on_evict=None, max_elements=GRAPH_WORKSPACE_MAX_ELEMENTS,
+                 max_recipes=GRAPH_WORKSPACE_MAX_RECIPES):
+        self.build = build
+        self.on_evict = on_evict
+        self.max_elements = max_elements
+        self.max_recipes = max_recipes
+        self.latest_id = None
+        self._graphs = OrderedDict()
+        self._sizes = {}
+        self._recipes = OrderedDict()
+        self._total = 0
+        self._evicted = []
+        self._lock = threading.Lock()
+
+    def create(self, query, max_results):
+        """Returns ``(workspace id, graph)`` for the query, building it only if it is not in memory."""
+        key = workspace_id(query, max_results)
+        with self._lock:
+            if len(self._recipes.get(key, ())) != 1:
+                # Same id but grown or never built: start over from this query
+                self._drop(key)
+                self._remember(key, [(query, max_results)])
+            self.latest_id = key
+        self._release_evicted()
+        return key, self.get(key)
+
+    def extend(self, key, query, max_results, grow):
+        """Grows a workspace in place with ``grow(graph)`` and records the step for rebuilds."""
+        graph = self.get(key)
+        if graph is None:
+            return None
+        # Concurrent extends of one workspace run one after the other; readers take the same lock
+        with graph.lock:
+            grow(graph)
+            with self._lock:
+                self._remember(key, self._recipes.get(key, []) + [(query, max_results)])
+                self.latest_id = key
+                self._resize(key, graph)
+        self._release_evicted()
+        return graph
+
+    def get(self, key=None):
+        """Returns the workspace's graph (the latest one if no id is given), rebuilding it if evicted."""
+        with self._lock:
+            key = key or self.latest_id
+            if key in self._graphs:
+                self._graphs.move_to_end(key)
+                self._recipes.move_to_end(key)
+                return self._graphs[key]
+            steps = self._recipes.get(key)
+        if not steps:
+            return None
+
+        graph = self.build(key, steps)
+        with self._lock:
+            if key in self._graphs:
+                return self._graphs[key]
+            self._graphs[key] = graph
+            self._resize(key, graph)
+        self._release_evicted()
+        return graph
+
+    def _remember(self, key, steps):
+        self._recipes[key] = steps
+        self._recipes.move_to_end(key)
+        while len(self._recipes) > self.max_recipes:
+            old_key, _ = self._recipes.popitem(last=False)
+            self._drop(old_key)
+
+    def _resize(self, key, graph):
+        size = graph.graph.number_of_nodes() + graph.graph.number_of_edges()
+        self._total += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        # Evict least recently used workspaces, but always keep the one just touched
+        while self._total > self.max_elements and len(self._graphs) > 1:
+            old_key = next(iter(self._graphs))
+            if old_key == key:
+                self._graphs.move_to_end(key)
+                old_key = next(iter(self._graphs))
+            self._drop(old_key)
+
+    def _drop(self, key):
+        graph = self._graphs.pop(key, None)
+        self._total -= self._sizes.pop(key, 0)
+        if graph is not None and self.on_evict:
+            self._evicted.append(graph)
+
+    def _release_evicted(self):
+        """Runs ``on_evict`` for graphs dropped since the last call; must be called without locks held."""
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        for graph in evicted:
+            self.on_evict(graph)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workspaces": len(self._graphs),
+                "elements": self._total,
+                "max_elements": self.max_elements,
+                "known_workspaces": len(self._recipes),
+            }
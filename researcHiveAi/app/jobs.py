@@ -0,0 +1,109 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of ingestion jobs processed at once; further uploads wait in the queue
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+# Finished jobs kept around so clients can still read their final status
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+
+QUEUED = "queued"
+DONE = "done"
+FAILED = "failed"
+
+
+class IngestionJob:
+    """Progress of one background document ingestion."""
+
+    def __init__(self, doc_id):
+        self.job_id = uuid.uuid4().hex
+        self.doc_id = doc_id
+        self.stage = QUEUED
+        self.percent = 0
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.stage in (DONE, FAILED)
+
+    def update(self, stage, percent=None):
+        self.stage = stage
+        if percent is not None:
+            self.percent = max(0, min(100, int(percent)))
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "document_id": self.doc_id,
+            "stage": self.stage,
+            "percent": self.percent,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Runs ingestion jobs on a bounded worker pool, one job per document at a time."""
+
+    def __init__(self, workers=INGEST_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._active = {}
+        # Last failed job per document, so failures are reported instead of retried forever
+        self._failed = OrderedDict()
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+
+    def submit(self, doc_id, fn):
+        """Queues ``fn(job)`` for the document, reusing the job already running for it."""
+        with self._lock:
+            job = self._active.get(doc_id)
+            if job is not None:
+                return job
+            job = IngestionJob(doc_id)
+            self._jobs[job.job_id] = job
+            self._active[doc_id] = job
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        try:
+            fn(job)
+            job.update(DONE, 100)
+        except Exception as e:
+            print(f"Ingestion job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.update(FAILED)
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop(job.doc_id, None)
+                self._failed.pop(job.doc_id, None)
+                if job.stage == FAILED:
+                    self._failed[job.doc_id] = job
+                self._trim()
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+        while len(self._failed) > self._max_finished:
+            self._failed.popitem(last=False)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def failed_job(self, doc_id):
+        """Returns the document's last job if it failed and no later job succeeded."""
+        with self._lock:
+            return self._failed.get(doc_id)
+
+    def active_job(self, doc_id):
+        """Returns the unfinished job for a document, if one is queued or running."""
+        with self._lock:
+            return self._active.get(doc_id)
@@ -0,0 +1,103 @@
+"""MP3 frame-level helpers for joining audio without decoding it.
+
+MP3 streams with the same MPEG version, sample rate and channel mode can be
+joined by concatenating their frames, as long as each piece starts with a
+self-contained frame (true for the start of every encoded file). Tags and
+the Xing/Info header of each piece are dropped so players do not take the
+first piece's length for the whole stream.
+"""
+
+# Bitrates in kbit/s by [MPEG-1][bitrate index] for Layer III
+_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+# Sample rates in Hz by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _parse_header(data, offset):
+    """Returns ``(format, frame length)`` of a Layer III frame header at ``offset``, or None."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x3
+    layer = (data[offset + 1] >> 1) & 0x3
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (data[offset + 2] >> 1) & 0x1
+    channel_mode = data[offset + 3] >> 6
+    length = (144 if mpeg1 else 72) * _BITRATES[mpeg1][bitrate_index] * 1000 // sample_rate + padding
+    return (version, sample_rate, channel_mode == 3, bitrate_index), length
+
+
+def _side_info_size(version, mono):
+    if version == 3:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+
+def _skip_id3v2(data):
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        return 10 + size + (10 if data[5] & 0x10 else 0)
+    return 0
+
+
+def split_frames(data):
+    """Returns ``(format, frames)`` of an MP3 file, without tags or the Xing/Info header.
+
+    ``format`` is ``(version bits, sample rate, mono, bitrate index)`` of the
+    first frame; ``frames`` is the raw frame bytes. Raises ValueError when
+    no MPEG Layer III frames are found.
+    """
+    offset = _skip_id3v2(data)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+    first_format, frames = None, []
+    while offset < end:
+        header = _parse_header(data, offset)
+        if header is None:
+            offset += 1  # resynchronise past junk bytes
+            continue
+        frame_format, length = header
+        frame = data[offset:offset + length]
+        offset += length
+        if first_format is None:
+            first_format = frame_format
+            tag_offset = 4 + _side_info_size(frame_format[0], frame_format[2])
+            if frame[tag_offset:tag_offset + 4] in (b"Xing", b"Info"):
+                continue
+        frames.append(frame)
+    if first_format is None:
+        raise ValueError("No MP3 frames found")
+    return first_format, b"".join(frames)
+
+
+def bitrate_kbps(frame_format):
+    version, _, _, bitrate_index = frame_format
+    return _BITRATES[version == 3][bitrate_index]
+
+
+def same_stream_format(a, b):
+    """True when frames of the two formats can be concatenated (bitrate may differ)."""
+    return a[:3] == b[:3]
+
+
+def silence_frames(frame_format, duration_ms):
+    """Pre-encoded digital silence: frames with zeroed side info, in the given format."""
+    version, sample_rate, mono, bitrate_index = frame_format
+    mpeg1 = version == 3
+    header = bytes((
+        0xFF,
+        0xE0 | (version << 3) | (1 << 1) | 1,  # Layer III, no CRC
+        (bitrate_index << 4) | (_SAMPLE_RATES[version].index(sample_rate) << 2),
+        0xC0 if mono else 0x00,
+    ))
+    length = (144 if mpeg1 else 72) * _BITRATES[mpeg1][bitrate_index] * 1000 // sample_rate
+    frame = header + bytes(length - len(header))
+    samples_per_frame = 1152 if mpeg1 else 576
+    count = max(1, round(duration_ms * sample_rate / 1000 / samples_per_frame))
+    return frame * count
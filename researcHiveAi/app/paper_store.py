@@ -0,0 +1,103 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+
+PAPER_STORE_PATH = os.getenv(
+    "PAPER_STORE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "papers.sqlite3")
+)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class PaperStore:
+    """Persistent arXiv paper metadata with an FTS5 index over title and summary.
+
+    Papers are upserted by their arXiv ``entry_id`` (the paper ``link``), so
+    every fetch grows the local corpus that later queries are answered from.
+    """
+
+    def __init__(self, path=PAPER_STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            "entry_id TEXT PRIMARY KEY, title TEXT NOT NULL, authors TEXT NOT NULL, summary TEXT NOT NULL, "
+            "published TEXT, categories TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+            "title, summary, content='papers', content_rowid='rowid')"
+        )
+        # Keep the external-content FTS index in step with the papers table
+        self._conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts (rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, summary)
+                VALUES ('delete', old.rowid, old.title, old.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts (papers_fts, rowid, title, summary)
+                VALUES ('delete', old.rowid, old.title, old.summary);
+                INSERT INTO papers_fts (rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+            END;
+        """)
+        self._conn.commit()
+
+    def upsert(self, papers):
+        """Inserts or refreshes papers (dicts as built by ``fetch_papers``) keyed by their link."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO papers VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (entry_id) DO UPDATE SET title = excluded.title, authors = excluded.authors, "
+                "summary = excluded.summary, published = excluded.published, "
+                "categories = excluded.categories, fetched_at = excluded.fetched_at",
+                [
+                    (paper["link"], paper["title"], json.dumps(paper["authors"]), paper["summary"],
+                     paper["published"], paper["categories"], now)
+                    for paper in papers
+                ]
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def match_expression(query):
+        """FTS5 query requiring every word of the free-text query, with each word quoted."""
+        return " ".join(f'"{token}"' for token in TOKEN_PATTERN.findall(query.lower()))
+
+    def search(self, query, limit=10):
+        """Returns up to ``limit`` stored papers matching all words of the query, best first."""
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.entry_id, p.title, p.authors, p.summary, p.published, p.categories "
+                "FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+                "WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts, 2.0, 1.0) LIMIT ?",
+                (expression, limit)
+            ).fetchall()
+        return [
+            {
+                "title": title,
+                "authors": json.loads(authors),
+                "summary": summary,
+                "link": entry_id,
+                "published": published,
+                "categories": categories,
+            }
+            for entry_id, title, authors, summary, published, categories in rows
+        ]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
@@ -0,0 +1,101 @@
+import os
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+
+# Number of worker processes used for parallel page extraction
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+# Documents with fewer pages than this are extracted serially
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+# Pages extracted per worker task; at most two tasks per worker are in flight
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Workers are started fresh rather than forked from the threaded server process
+PDF_EXTRACT_START_METHOD = os.getenv("PDF_EXTRACT_START_METHOD", "forkserver")
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Returns the shared process pool with ``workers`` processes, created on first use.
+
+    Pools are kept per size and never replaced, so overlapping extractions can
+    safely share them. The server only ever asks for ``PDF_EXTRACT_WORKERS``.
+    """
+    workers = max(1, workers)
+    with _pool_lock:
+        if workers not in _pools:
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(PDF_EXTRACT_START_METHOD),
+            )
+        return _pools[workers]
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Worker entry point: opens its own document and extracts pages [start, stop)."""
+    with fitz.open(pdf_path) as doc:
+        return [doc[i].get_text("text") for i in range(start, stop)]
+
+
+def page_count(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+
+def extract_pages_serial(pdf_path):
+    """Extracts the text of every page in order in the current process."""
+    return _extract_page_range(pdf_path, 0, page_count(pdf_path))
+
+
+def _page_ranges(total, pages_per_task):
+    for start in range(0, total, pages_per_task):
+        yield start, min(start + pages_per_task, total)
+
+
+def iter_pages_parallel(pdf_path, workers=PDF_EXTRACT_WORKERS, pages_per_task=PDF_PAGES_PER_TASK):
+    """Extracts small page ranges on a pool of ``workers`` processes and yields pages in document order.
+
+    Only ``2 * min(workers, tasks)`` ranges are submitted ahead of the
+    consumer, so memory stays bounded however large the document is.
+    """
+    total = page_count(pdf_path)
+    pages_per_task = max(1, pages_per_task)
+    in_flight = 2 * max(1, min(workers, -(-total // pages_per_task)))
+    ranges = _page_ranges(total, pages_per_task)
+
+    pool = _get_pool(workers)
+    pending = deque()
+    try:
+        for start, stop in ranges:
+            pending.append(pool.submit(_extract_page_range, pdf_path, start, stop))
+            if len(pending) >= in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # The consumer stopped early or a range failed: drop work nobody will read
+        for future in pending:
+            future.cancel()
+
+
+def extract_pages_parallel(pdf_path, workers=PDF_EXTRACT_WORKERS):
+    """Extracts every page on the process pool and returns them in order."""
+    return list(iter_pages_parallel(pdf_path, workers))
+
+
+def iter_pages(pdf_path, workers=PDF_EXTRACT_WORKERS, min_pages=PDF_PARALLEL_MIN_PAGES):
+    """Yields page texts in order, in parallel for large documents and serially otherwise."""
+    if workers > 1 and page_count(pdf_path) >= min_pages:
+        yield from iter_pages_parallel(pdf_path, workers)
+        return
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            yield page.get_text("text")
+
+
+def extract_pages(pdf_path, workers=PDF_EXTRACT_WORKERS, min_pages=PDF_PARALLEL_MIN_PAGES):
+    """Extracts page texts, in parallel for large documents and serially otherwise."""
+    return list(iter_pages(pdf_path, workers, min_pages))
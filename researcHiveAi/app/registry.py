@@ -0,0 +1,109 @@
+"""Process-wide registry of heavy models and API clients.
+
+Each entry is constructed on first use and then shared by every blueprint,
+so importing the app stays cheap and the process holds a single copy of
+each model.
+"""
+import os
+import threading
+
+# Entries to load on a background thread at start-up, e.g. "embedding_model,llm"
+WARM_UP_MODELS = [name for name in os.getenv("WARM_UP_MODELS", "").split(",") if name.strip()]
+# Device for the torch embedding backend; None lets sentence-transformers pick
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+
+_factories = {}
+_instances = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, factory):
+    """Declares how to build an entry; nothing is constructed until it is requested."""
+    with _registry_lock:
+        _factories[name] = factory
+        _locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    """Returns the shared instance, building it on first use (once, even under concurrency)."""
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _locks[name]:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def warm_up(names=None, background=True):
+    """Builds the given entries ahead of the first request, by default on a daemon thread."""
+    names = [name.strip() for name in (WARM_UP_MODELS if names is None else names)]
+
+    def load_all():
+        for name in names:
+            try:
+                get(name)
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _embedding_model():
+    from app.embeddings import load_embedding_model
+    return load_embedding_model(device=EMBEDDING_DEVICE)
+
+
+def _llm():
+    from langchain_mistralai import ChatMistralAI
+    return ChatMistralAI(model="mistral-large-latest", temperature=0)
+
+
+def _keyword_extractor():
+    from yake import KeywordExtractor
+    return KeywordExtractor(lan="en", top=5)
+
+
+def _groq_client():
+    from groq import Groq
+    from app.config import Config
+    return Groq(api_key=Config.GROQ_API_KEY)
+
+
+def _elevenlabs_client():
+    from elevenlabs.client import ElevenLabs
+    from app.config import Config
+    return ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
+
+
+register("embedding_model", _embedding_model)
+register("llm", _llm)
+register("keyword_extractor", _keyword_extractor)
+register("groq_client", _groq_client)
+register("elevenlabs_client", _elevenlabs_client)
+
+
+def get_embedding_model():
+    return get("embedding_model")
+
+
+def get_llm():
+    return get("llm")
+
+
+def get_keyword_extractor():
+    return get("keyword_extractor")
+
+
+def get_groq_client():
+    return get("groq_client")
+
+
+def get_elevenlabs_client():
+    return get("elevenlabs_client")
@@ -1,89 +1,361 @@
+import io
 import os
-import fitz  # PyMuPDF
+import json
+import hashlib
+import time
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_mistralai import ChatMistralAI
-from langchain.schema import HumanMessage
-
-from flask import Blueprint, request, jsonify
-from flask import send_file
-from groq import Groq
-from elevenlabs.client import ElevenLabs
-from elevenlabs import save
+from concurrent.futures import ThreadPoolExecutor
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.messages import HumanMessage
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from pydub import AudioSegment
-from app.config import Config 
+from app.document_store import Document, DocumentStore
+from app.embeddings import embedding_model_id
+from app.registry import get_embedding_model, get_llm, get_groq_client, get_elevenlabs_client
+from app.embedding_cache import EmbeddingCache
+from app.pdf_extract import extract_pages, iter_pages, page_count
+from app.jobs import JobQueue
+from app.batching import MicroBatcher
+from app.answer_cache import SemanticAnswerCache
+from app.summary_cache import SummaryCache
+from app.tts_cache import TTSCache
+from app.bm25 import reciprocal_rank_fusion
+from app.context_packer import pack_context
+from app.mp3_frames import bitrate_kbps, same_stream_format, silence_frames, split_frames
+from app.faiss_index import (
+    FAISS_INDEX_TYPE, FAISS_TRAIN_SAMPLE_SIZE, create_index, fallback_index_type, needs_training, train_index
+)
 from pydantic import BaseModel, Field
 
-# Load the embedding model
-embedding_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+# The embedding model (torch, onnx, onnx-int8 or remote backend) and the Mistral model are
+# loaded on first use through app.registry and shared with the other blueprints
 
-# Load the Mistral model
-llm = ChatMistralAI(model="mistral-large-latest", temperature=0)
 chat_routes = Blueprint("chat_routes", __name__)
 
-# Global variables for FAISS index and document chunks
-faiss_index = None
-chunked_texts = None
-pdf_path = "uploaded_paper.pdf"  # Default PDF file location
+# Number of chunks embedded and added to the index per ingestion step
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Processed papers, persisted on disk and keyed by the PDF content hash
+document_store = DocumentStore()
+
+# Chunk embeddings keyed by chunk text and model, shared by every upload
+embedding_cache = EmbeddingCache()
+
+# Background ingestion of uploaded papers
+ingestion_jobs = JobQueue()
+
+# /chat answers reused for semantically equivalent questions about the same paper
+answer_cache = SemanticAnswerCache()
+
+# Full-document (map-reduce) summaries: concurrency, group sizes and cached partial summaries
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+SUMMARY_CHUNKS_PER_GROUP = max(1, int(os.getenv("SUMMARY_CHUNKS_PER_GROUP", "2")))
+# Each reduce level must merge at least two summaries or it would never finish
+SUMMARY_REDUCE_FANOUT = max(2, int(os.getenv("SUMMARY_REDUCE_FANOUT", "8")))
+summary_cache = SummaryCache()
+summary_executor = ThreadPoolExecutor(max_workers=SUMMARY_MAX_CONCURRENCY, thread_name_prefix="summarize")
 
 # ------------------------- Extract & Chunk PDF ------------------------- #
 def extract_text_from_pdf(pdf_path):
     """Extracts text from a given PDF file."""
     try:
-        doc = fitz.open(pdf_path)
-        text = "".join(page.get_text("text") + "\n\n" for page in doc).strip()
+        text = "".join(page + "\n\n" for page in extract_pages(pdf_path)).strip()
         return text
     except Exception as e:
         print(f"Error extracting text: {e}")
         return None
 
-def chunk_text(text, chunk_size=2000, chunk_overlap=200):
-    """Splits text into smaller chunks for embedding retrieval."""
+def iter_chunks(pages, chunk_size=2000, chunk_overlap=200):
+    """Incrementally chunks a stream of page texts, holding only a few pages at a time."""
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return text_splitter.split_text(text)
+    buffer = ""
+    for page in pages:
+        buffer += page + "\n\n"
+        if len(buffer) < chunk_size * 4:
+            continue
+        chunks = text_splitter.split_text(buffer)
+        # The last chunk may continue on the next page, so it is re-split with it
+        yield from chunks[:-1]
+        buffer = chunks[-1] + "\n\n" if chunks else ""
+    yield from text_splitter.split_text(buffer)
+
+def batched(iterable, batch_size):
+    """Groups an iterable into lists of at most ``batch_size`` items."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_chunks(chunks):
+    """Embeds chunks, encoding only those missing from the embedding cache."""
+    # Remote vectors are keyed on the model the embedding service reports it runs
+    model_id = embedding_model_id(model=get_embedding_model())
+    vectors = embedding_cache.get_many(model_id, chunks)
+    misses = [i for i, vector in enumerate(vectors) if vector is None]
+    if misses:
+        missing_chunks = [chunks[i] for i in misses]
+        encoded = get_embedding_model().encode(missing_chunks)
+        embedding_cache.put_many(model_id, missing_chunks, encoded)
+        for i, vector in zip(misses, encoded):
+            vectors[i] = vector
+    return np.vstack(vectors).astype(np.float32), len(misses)
+
+def create_faiss_index(dimension, index_type=FAISS_INDEX_TYPE):
+    """Creates an empty FAISS index for streaming ingestion.
+
+    Index types that need training start out as a flat index; ``build_document``
+    trains the real index once enough vectors have arrived.
+    """
+    if needs_training(index_type):
+        return faiss.IndexFlatL2(dimension)
+    return create_index(index_type, dimension)
+
+def build_document(doc_id, job=None, index_type=FAISS_INDEX_TYPE):
+    """Streams pages -> chunks -> embedding batches -> FAISS index, then persists the result.
+
+    The index is built off to the side, so memory stays bounded by the batch
+    size and concurrent queries never see it half-updated. Partial snapshots
+    are published each time the number of indexed chunks doubles (keeping the
+    copying linear overall), so queries can already run against a partially
+    built paper; the complete snapshot is swapped in atomically at the end.
+    """
+    pdf_path = document_store.pdf_path(doc_id)
+    total_pages = page_count(pdf_path)
+    index = create_faiss_index(get_embedding_model().get_sentence_embedding_dimension(), index_type)
+    chunks = []
+    published = 0
+    pending_training = needs_training(index_type)
+    encoded = 0
+    answer_cache.invalidate(doc_id)
+
+    def tracked_pages():
+        for number, page in enumerate(iter_pages(pdf_path), 1):
+            yield page
+            if job:
+                job.update("embedding", 95 * number / max(total_pages, 1))
 
-def create_faiss_index(chunks):
-    """Creates a FAISS index from the research paper chunks."""
     try:
-        embeddings = embedding_model.encode(chunks, show_progress_bar=True)
-        index = faiss.IndexFlatL2(embeddings.shape[1])
-        index.add(np.array(embeddings, dtype=np.float32))
-        return index, embeddings
-    except Exception as e:
-        print(f"Error creating FAISS index: {e}")
-        return None, None
-
-def ensure_pdf_processed():
-    """Ensures a PDF is processed before querying FAISS."""
-    global faiss_index, chunked_texts, pdf_path
-    if not os.path.exists(pdf_path):
-        return False
-
-    if not faiss_index or not chunked_texts:
-        text = extract_text_from_pdf(pdf_path)
-        if not text:
-            return False
-        chunked_texts = chunk_text(text)
-        faiss_index, _ = create_faiss_index(chunked_texts)
-    return True
-
-def search_faiss(query, k=3):
-    """Finds the most relevant chunks using FAISS."""
-    if not faiss_index:
+        if job:
+            job.update("extracting", 0)
+        for batch in batched(iter_chunks(tracked_pages()), EMBED_BATCH_SIZE):
+            vectors, misses = embed_chunks(batch)
+            index.add(vectors)
+            chunks.extend(batch)
+            encoded += misses
+            if pending_training and index.ntotal >= FAISS_TRAIN_SAMPLE_SIZE:
+                index_type = fallback_index_type(index_type, index.ntotal)
+                if needs_training(index_type):
+                    index = train_index(index_type, index.reconstruct_n(0, index.ntotal))
+                pending_training = False
+            if len(chunks) >= 2 * published:
+                document_store.publish_partial(Document(doc_id, faiss.clone_index(index), chunks, {}, complete=False))
+                published = len(chunks)
+        if not chunks:
+            raise ValueError("No text could be extracted from the PDF")
+        if pending_training:
+            # Small papers keep the flat index rather than training on a handful of vectors
+            index_type = fallback_index_type(index_type, index.ntotal)
+            if needs_training(index_type):
+                index = train_index(index_type, index.reconstruct_n(0, index.ntotal))
+        if job:
+            job.update("saving", 95)
+        metadata = {"doc_id": doc_id, "num_chunks": len(chunks), "pages": total_pages, "index_type": index_type}
+        document = Document(doc_id, index, chunks, metadata)
+        document_store.save(document)
+        # Answers given while the index was partial may be incomplete
+        answer_cache.invalidate(doc_id)
+    except Exception:
+        document_store.discard(doc_id)
+        raise
+    print(f"Indexed {len(chunks)} chunks ({len(chunks) - encoded} cached, {encoded} encoded)")
+    return document
+
+def start_ingestion(doc_id):
+    """Queues a background build of the document, or returns the job already building it."""
+    return ingestion_jobs.submit(doc_id, lambda job: build_document(doc_id, job))
+
+def resolve_document_id():
+    """Reads the document id from the request, defaulting to the latest upload."""
+    data = request.get_json(silent=True) or {}
+    doc_id = data.get("document_id") or request.args.get("document_id")
+    return doc_id or document_store.latest()
+
+def load_requested_document():
+    """Returns ``(document, error_response)`` for the document named by the request.
+
+    Documents that are still being ingested are rejected with 409 unless the
+    request opts into querying the partial index with ``allow_partial``;
+    documents whose ingestion failed are rejected with 422 until re-uploaded.
+    """
+    doc_id = resolve_document_id()
+    if not doc_id:
+        return None, (jsonify({"error": "No PDF uploaded. Upload a file first."}), 400)
+    if not document_store.is_valid_id(doc_id):
+        return None, (jsonify({"error": "Invalid document id."}), 400)
+
+    job = ingestion_jobs.active_job(doc_id)
+    document = document_store.get(doc_id)
+    if job:
+        data = request.get_json(silent=True) or {}
+        if data.get("allow_partial") and document and document.chunks:
+            return document, None
+        return None, (jsonify({"error": "Document is still being processed.", "job": job.to_dict()}), 409)
+    if document:
+        return document, None
+
+    failed = ingestion_jobs.failed_job(doc_id)
+    if failed:
+        return None, (jsonify({"error": f"Document processing failed: {failed.error}", "job": failed.to_dict()}), 422)
+
+    if document_store.has_pdf(doc_id):
+        # Uploaded but never finished processing (e.g. the worker restarted)
+        job = start_ingestion(doc_id)
+        return None, (jsonify({"error": "Document is still being processed.", "job": job.to_dict()}), 409)
+    return None, (jsonify({"error": f"Document {doc_id} not found. Upload it first."}), 404)
+
+def encode_query_batch(queries):
+    """Encodes a micro-batch of concurrent queries in a single forward pass."""
+    return list(get_embedding_model().encode(queries, convert_to_numpy=True))
+
+def search_batch(searches):
+    """Runs one FAISS search per (document, k, knobs) group of concurrent searches."""
+    groups = {}
+    results = [None] * len(searches)
+    for position, (document, _, k, nprobe, ef_search) in enumerate(searches):
+        # A malformed item fails on its own instead of taking the whole batch down
+        try:
+            groups.setdefault((id(document), k, nprobe, ef_search), []).append(position)
+        except Exception as e:
+            results[position] = e
+
+    for positions in groups.values():
+        document, _, k, nprobe, ef_search = searches[positions[0]]
+        vectors = np.vstack([searches[position][1] for position in positions])
+        try:
+            found = document.search_many(vectors, k, nprobe=nprobe, ef_search=ef_search)
+        except Exception as e:
+            found = [e] * len(positions)
+        for position, chunk_ids in zip(positions, found):
+            results[position] = chunk_ids
+    return results
+
+# Default retrieval: dense (FAISS), lexical (BM25) or hybrid (both, fused by reciprocal rank)
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+# Candidates taken from each ranking before fusion in hybrid mode
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# Concurrent requests share model forward passes and index searches
+query_encoder = MicroBatcher(encode_query_batch, name="query-encoder")
+index_searcher = MicroBatcher(search_batch, name="index-searcher")
+
+def embed_query(query):
+    return query_encoder.submit(query)
+
+def search_chunk_ids(document, query, k=3, nprobe=None, ef_search=None, query_embedding=None,
+                     mode=RETRIEVAL_MODE):
+    """Returns the ids of the chunks most relevant to the query.
+
+    ``mode`` selects dense (FAISS), lexical (BM25) or hybrid retrieval; lexical
+    and hybrid fall back to dense while the BM25 index is not built yet.
+    ``nprobe`` (IVF indexes) and ``ef_search`` (HNSW) trade recall for latency.
+    """
+    if not document:
         return []
-    query_embedding = embedding_model.encode([query], convert_to_numpy=True)
-    distances, indices = faiss_index.search(query_embedding, k)
-    return [chunked_texts[i] for i in indices[0] if i < len(chunked_texts)]
+    lexical_index = document.lexical_index
+    if mode == "lexical" and lexical_index:
+        return lexical_index.search(query, k)
+
+    if query_embedding is None:
+        query_embedding = embed_query(query)
+    if mode != "hybrid" or not lexical_index:
+        return index_searcher.submit((document, query_embedding, k, nprobe, ef_search))
+
+    depth = max(k, HYBRID_CANDIDATES)
+    dense_ids = index_searcher.submit((document, query_embedding, depth, nprobe, ef_search))
+    return reciprocal_rank_fusion([dense_ids, lexical_index.search(query, depth)], k)
+
+def search_options():
+    """Reads the optional ``retrieval`` mode and ``nprobe``/``ef_search`` knobs from the request body.
+
+    Returns ``(options, None)`` or ``(None, error_response)`` for invalid values.
+    """
+    data = request.get_json(silent=True) or {}
+    mode = data.get("retrieval", RETRIEVAL_MODE)
+    if mode not in RETRIEVAL_MODES:
+        return None, (jsonify({"error": f"retrieval must be one of {', '.join(RETRIEVAL_MODES)}."}), 400)
+
+    options = {"mode": mode}
+    for name in ("nprobe", "ef_search"):
+        value = data.get(name)
+        if value is not None:
+            try:
+                # bool is an int subclass but never a meaningful knob value
+                if isinstance(value, bool) or not isinstance(value, (int, str)):
+                    raise ValueError(value)
+                value = int(value)
+                if value < 1:
+                    raise ValueError(value)
+            except ValueError:
+                return None, (jsonify({"error": f"{name} must be a positive integer."}), 400)
+        options[name] = value
+    return options, None
+
+def wants_stream():
+    """True when the client asked for a Server-Sent Events response."""
+    data = request.get_json(silent=True) or {}
+    return bool(data.get("stream")) or request.args.get("stream", "").lower() in ("1", "true")
+
+def sse_event(data, event=None):
+    """Formats one Server-Sent Event carrying a JSON payload."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+def stream_llm_response(prompt, fallback, document, chunk_ids, on_complete=None, context=None):
+    """Streams LLM tokens as ``data: {"token": ...}`` events, then a final ``done`` event.
+
+    When there is no prompt (nothing was retrieved) the fallback text is sent as
+    the only token. ``on_complete`` receives the full text once streaming succeeds.
+    ``context`` carries the context-packing statistics reported in the final event.
+    """
+    def generate():
+        try:
+            if prompt is None:
+                yield sse_event({"token": fallback})
+            else:
+                tokens = []
+                for chunk in get_llm().stream([HumanMessage(content=prompt)]):
+                    if chunk.content:
+                        tokens.append(chunk.content)
+                        yield sse_event({"token": chunk.content})
+                if on_complete:
+                    on_complete("".join(tokens))
+        except Exception as e:
+            print(f"Error streaming LLM response: {e}")
+            yield sse_event({"error": str(e)}, event="error")
+        yield sse_event({"document_id": document.doc_id, "chunk_ids": chunk_ids, "context": context}, event="done")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ------------------------- AI Processing ------------------------- #
-def summarize_retrieved_chunks(retrieved_chunks):
-    """Summarizes retrieved chunks using Mistral."""
-    if not retrieved_chunks:
-        return "No relevant sections found in the document."
+NO_SUMMARY_CONTENT = "No relevant sections found in the document."
+NO_SUGGESTION_CONTENT = "No relevant content found for generating research ideas."
+NO_CHAT_CONTENT = "No relevant information found in the document."
 
-    prompt = """
+def summary_prompt(retrieved_chunks):
+    """Builds the Mistral prompt that summarizes the retrieved chunks."""
+    return """
     ### System Role:
     You are a highly skilled AI research assistant with expertise in summarizing complex research papers. Your goal is to extract and condense the most critical information from the provided text into a concise and coherent summary.
 
@@ -101,15 +373,91 @@ def summarize_retrieved_chunks(retrieved_chunks):
     ### Text to Summarize:
     """ + "\n\n".join(retrieved_chunks)
 
-    response = llm.invoke([HumanMessage(content=prompt)])
+def summarize_retrieved_chunks(retrieved_chunks):
+    """Summarizes retrieved chunks using Mistral."""
+    if not retrieved_chunks:
+        return NO_SUMMARY_CONTENT
+
+    response = get_llm().invoke([HumanMessage(content=summary_prompt(retrieved_chunks))])
     return response.content
 
-def generate_research_suggestions(retrieved_chunks):
-    """Generates research suggestions from retrieved sections using Mistral."""
-    if not retrieved_chunks:
-        return "No relevant content found for generating research ideas."
+def partial_summary_prompt(text):
+    """Map step: condenses one slice of the paper."""
+    return """
+    ### System Role:
+    You are a highly skilled AI research assistant. You are given one excerpt of a longer research paper.
+
+    ### Instructions:
+    1. Summarize the excerpt in one or two short paragraphs.
+    2. Keep every detail about the research purpose, methodology, datasets, results and conclusions that appears in it.
+    3. Do not speculate about parts of the paper that are not in the excerpt.
 
-    prompt = """
+    ### Excerpt:
+    """ + text
+
+def combine_summaries_prompt(text):
+    """Intermediate reduce step: merges several partial summaries into one."""
+    return """
+    ### System Role:
+    You are a highly skilled AI research assistant. You are given consecutive partial summaries of one research paper.
+
+    ### Instructions:
+    1. Merge them into a single coherent summary that preserves their order.
+    2. Keep every detail about the research purpose, methodology, results and conclusions; drop repetition.
+
+    ### Partial Summaries:
+    """ + text
+
+def summarize_cached(prompt_fn, text):
+    """Summarizes one slice of text, reusing the stored summary of identical text."""
+    namespace = f"{get_llm().model}/{prompt_fn.__name__}"
+    summary = summary_cache.get(namespace, text)
+    if summary is None:
+        summary = get_llm().invoke([HumanMessage(content=prompt_fn(text))]).content
+        summary_cache.put(namespace, text, summary)
+    return summary
+
+def content_defined_groups(texts, group_size):
+    """Groups consecutive texts, closing a group after any text whose hash falls on a boundary.
+
+    Boundaries depend on each text's content rather than its position, so
+    inserting or editing a chunk only changes the groups around it and every
+    other group keeps its cached summary. Groups average ``group_size`` texts
+    and never exceed twice that.
+    """
+    if group_size <= 1:
+        return [[text] for text in texts]
+    groups, current = [], []
+    for text in texts:
+        current.append(text)
+        digest = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        if digest % group_size == 0 or len(current) >= 2 * group_size:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+def map_reduce_summaries(chunks):
+    """Summarizes every chunk group concurrently, then reduces the partial summaries
+    hierarchically until at most ``SUMMARY_REDUCE_FANOUT`` remain for the final prompt.
+    """
+    def summarize_groups(prompt_fn, groups):
+        texts = ["\n\n".join(group) for group in groups]
+        return list(summary_executor.map(lambda text: summarize_cached(prompt_fn, text), texts))
+
+    summaries = summarize_groups(partial_summary_prompt, content_defined_groups(chunks, SUMMARY_CHUNKS_PER_GROUP))
+    while len(summaries) > SUMMARY_REDUCE_FANOUT:
+        groups = content_defined_groups(summaries, SUMMARY_REDUCE_FANOUT)
+        if len(groups) == len(summaries):
+            # Every summary fell on a boundary; group by position so the level still shrinks
+            groups = [summaries[i:i + SUMMARY_REDUCE_FANOUT] for i in range(0, len(summaries), SUMMARY_REDUCE_FANOUT)]
+        summaries = summarize_groups(combine_summaries_prompt, groups)
+    return summaries
+
+def research_suggestions_prompt(retrieved_chunks):
+    """Builds the Mistral prompt that proposes future research directions."""
+    return """
     ### System Role:
     You are an expert research assistant with a deep understanding of academic research and innovation. Your task is to analyze the provided research content and propose actionable, insightful, and innovative future research ideas.
 
@@ -130,15 +478,39 @@ def generate_research_suggestions(retrieved_chunks):
     ### Text to Analyze:
     """ + "\n\n".join(retrieved_chunks)
 
-    response = llm.invoke([HumanMessage(content=prompt)])
+def generate_research_suggestions(retrieved_chunks):
+    """Generates research suggestions from retrieved sections using Mistral."""
+    if not retrieved_chunks:
+        return NO_SUGGESTION_CONTENT
+
+    response = get_llm().invoke([HumanMessage(content=research_suggestions_prompt(retrieved_chunks))])
     return response.content
 
+def chat_prompt(query, retrieved_chunks):
+    """Builds the Mistral prompt that answers a query from the retrieved chunks."""
+    return """
+        ### System Role:
+        You are a highly skilled research assistant. Your task is to answer the user's query based on the provided document sections. Ensure your response is accurate, concise, and directly addresses the query.
+
+        ### Instructions:
+        1. **Understand the Query**: Carefully analyze the user's question to identify the key points and intent.
+        2. **Use Document Context**: Base your response strictly on the provided document sections. Do not add external information or assumptions.
+        3. **Be Concise and Clear**: Provide a clear and concise answer. Avoid unnecessary details or repetition.
+        4. **Cite Relevant Sections**: If applicable, reference specific parts of the document to support your answer.
+
+        ### Query:
+        {query}
+
+        ### Relevant Document Sections:
+        """.format(query=query) + "\n\n".join(retrieved_chunks) + """
+
+        ### Response:
+        """
+
 # ------------------------- API Endpoints ------------------------- #
 @chat_routes.route("/refresh", methods=["POST"])
 def refresh_pdf():
-    """Handles new PDF uploads, processes the text, and refreshes embeddings."""
-    global faiss_index, chunked_texts, pdf_path
-
+    """Handles new PDF uploads and queues their processing in the background."""
     if "pdf" not in request.files:
         return jsonify({"error": "No PDF file provided"}), 400
 
@@ -147,93 +519,231 @@ def refresh_pdf():
         return jsonify({"error": "No selected file"}), 400
 
     try:
-        pdf_file.save(pdf_path)
-        
-        faiss_index = None
-        chunked_texts = None
-
-        if not ensure_pdf_processed():
-            return jsonify({"error": "Failed to process the uploaded PDF"}), 500
-
-        return jsonify({"message": "PDF uploaded and processed successfully"}), 200
+        doc_id = document_store.save_pdf(pdf_file.read())
+        document_store.set_latest(doc_id)
+
+        if document_store.is_processed(doc_id):
+            return jsonify({"message": "PDF uploaded and processed successfully", "document_id": doc_id}), 200
+
+        job = start_ingestion(doc_id)
+        return jsonify({
+            "message": "PDF uploaded, processing started",
+            "document_id": doc_id,
+            "job_id": job.job_id
+        }), 202
     except Exception as e:
         print(f"Error processing PDF: {e}")
         return jsonify({"error": str(e)}), 500
 
+@chat_routes.route("/refresh/status/<job_id>", methods=["GET"])
+def refresh_status(job_id):
+    """Reports the stage and progress of a background PDF ingestion."""
+    job = ingestion_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job.to_dict())
+
 @chat_routes.route("/summarize", methods=["POST"])
 def summarize():
     """Fetches relevant sections using FAISS and summarizes them."""
-    if not ensure_pdf_processed():
-        return jsonify({"error": "No PDF uploaded. Upload a file first."}), 400
+    document, error = load_requested_document()
+    if error:
+        return error
+
+    options, error = search_options()
+    if error:
+        return error
 
     query = request.json.get("query", "Summarize the research paper")
-    retrieved_chunks = search_faiss(query)
+    if request.json.get("mode") == "full":
+        # Map-reduce over the whole paper instead of the top retrieved chunks
+        chunks = list(document.chunks)
+        chunk_ids = list(range(len(chunks)))
+        retrieved_chunks = map_reduce_summaries(chunks) if chunks else []
+        context = None
+    else:
+        chunk_ids = search_chunk_ids(document, query, **options)
+        retrieved_chunks, context = pack_context(chunk_ids, document.chunks)
+
+    if wants_stream():
+        prompt = summary_prompt(retrieved_chunks) if retrieved_chunks else None
+        return stream_llm_response(prompt, NO_SUMMARY_CONTENT, document, chunk_ids, context=context)
+
     summary = summarize_retrieved_chunks(retrieved_chunks)
-    return jsonify({"summary": summary})
+    return jsonify({"summary": summary, "document_id": document.doc_id, "context": context})
 
 @chat_routes.route("/research_suggestions", methods=["POST"])
 def research_suggestions():
     """Fetches relevant sections using FAISS and generates research ideas."""
-    if not ensure_pdf_processed():
-        return jsonify({"error": "No PDF uploaded. Upload a file first."}), 400
+    document, error = load_requested_document()
+    if error:
+        return error
+
+    options, error = search_options()
+    if error:
+        return error
 
     query = request.json.get("query", "Suggest future research directions")
-    retrieved_chunks = search_faiss(query)
+    chunk_ids = search_chunk_ids(document, query, **options)
+    retrieved_chunks, context = pack_context(chunk_ids, document.chunks)
+
+    if wants_stream():
+        prompt = research_suggestions_prompt(retrieved_chunks) if retrieved_chunks else None
+        return stream_llm_response(prompt, NO_SUGGESTION_CONTENT, document, chunk_ids, context=context)
+
     suggestions = generate_research_suggestions(retrieved_chunks)
-    return jsonify({"research_suggestions": suggestions})
+    return jsonify({"research_suggestions": suggestions, "document_id": document.doc_id, "context": context})
 
 # ------------------------- Chat Route ------------------------- #
 @chat_routes.route("/chat", methods=["POST"])
 def chat():
     """Handles user queries and answers based on PDF content."""
-    if not ensure_pdf_processed():
-        return jsonify({"error": "No PDF uploaded. Upload a file first."}), 400
+    document, error = load_requested_document()
+    if error:
+        return error
 
     query = request.json.get("query", "")
     if not query:
         return jsonify({"error": "Query cannot be empty."}), 400
+    options, error = search_options()
+    if error:
+        return error
+
+    query_embedding = embed_query(query)
+    # Different retrieval settings retrieve different chunks, so they never share answers
+    variant = (options["mode"], options["nprobe"], options["ef_search"])
+    # Partial indexes may change the answer, so only complete documents use the cache
+    cached = answer_cache.lookup(document.doc_id, query_embedding, variant) if document.complete else None
+    if cached:
+        if wants_stream():
+            return stream_llm_response(None, cached.answer, document, cached.chunk_ids, context=cached.context)
+        return jsonify({
+            "response": cached.answer, "document_id": document.doc_id, "context": cached.context, "cached": True
+        })
+
+    chunk_ids = search_chunk_ids(document, query, query_embedding=query_embedding, **options)
+    retrieved_chunks, context = pack_context(chunk_ids, document.chunks)
+
+    def remember(answer):
+        if document.complete:
+            answer_cache.store(document.doc_id, query, query_embedding, answer, chunk_ids, context, variant)
+
+    if wants_stream():
+        prompt = chat_prompt(query, retrieved_chunks) if retrieved_chunks else None
+        return stream_llm_response(prompt, NO_CHAT_CONTENT, document, chunk_ids, on_complete=remember, context=context)
 
-    retrieved_chunks = search_faiss(query)
-    
     if not retrieved_chunks:
-        response_text = "No relevant information found in the document."
+        response_text = NO_CHAT_CONTENT
     else:
-        prompt = """
-        ### System Role:
-        You are a highly skilled research assistant. Your task is to answer the user's query based on the provided document sections. Ensure your response is accurate, concise, and directly addresses the query.
-
-        ### Instructions:
-        1. **Understand the Query**: Carefully analyze the user's question to identify the key points and intent.
-        2. **Use Document Context**: Base your response strictly on the provided document sections. Do not add external information or assumptions.
-        3. **Be Concise and Clear**: Provide a clear and concise answer. Avoid unnecessary details or repetition.
-        4. **Cite Relevant Sections**: If applicable, reference specific parts of the document to support your answer.
-
-        ### Query:
-        {query}
-
-        ### Relevant Document Sections:
-        """ + "\n\n".join(retrieved_chunks) + """
-
-        ### Response:
-        """
-
-        response = llm.invoke([HumanMessage(content=prompt.format(query=query))])
+        response = get_llm().invoke([HumanMessage(content=chat_prompt(query, retrieved_chunks))])
         response_text = response.content
+        remember(response_text)
     
-    return jsonify({"response": response_text})
-
-# Initialize new API clients (add after existing client initializations)
-groq_client = Groq(api_key=Config.GROQ_API_KEY)  # Use API key from Config
-elevenlabs_client = ElevenLabs(api_key=Config.ELEVENLABS_API_KEY) # Replace with your key
-# print(Config.ELEVENLABS_API_KEY)
+    return jsonify({"response": response_text, "document_id": document.doc_id, "context": context, "cached": False})
+
+@chat_routes.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the semantic answer cache and the TTS segment cache."""
+    return jsonify({"answer_cache": answer_cache.stats(), "tts_cache": tts_cache.stats()})
+
+# Groq and ElevenLabs clients are created on first use through app.registry
+
+# Text-to-speech: voices, model and the number of segments synthesised at once across requests
+HOST_VOICE = "Rachel"
+GUEST_VOICE = "Adam"
+TTS_MODEL = "eleven_multilingual_v2"
+# Every segment is requested in this format so their frames can be concatenated
+TTS_OUTPUT_FORMAT = "mp3_44100_128"
+# Pause after every question and answer
+PODCAST_PAUSE_MS = 800
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+tts_executor = ThreadPoolExecutor(max_workers=TTS_MAX_CONCURRENCY, thread_name_prefix="tts")
+# Synthesised segments reused across podcast generations
+tts_cache = TTSCache()
+
+# Podcast script generation: Groq model, per-request timeout (s), retries and backoff (s),
+# questions per Q&A request and how many completions run at once across requests
+PODCAST_SCRIPT_MODEL = "llama-3.3-70b-versatile"
+PODCAST_SCRIPT_TIMEOUT = float(os.getenv("PODCAST_SCRIPT_TIMEOUT", "60"))
+PODCAST_SCRIPT_RETRIES = int(os.getenv("PODCAST_SCRIPT_RETRIES", "2"))
+PODCAST_SCRIPT_BACKOFF = float(os.getenv("PODCAST_SCRIPT_BACKOFF", "1"))
+PODCAST_QUESTIONS_PER_REQUEST = int(os.getenv("PODCAST_QUESTIONS_PER_REQUEST", "3"))
+PODCAST_SCRIPT_MAX_CONCURRENCY = int(os.getenv("PODCAST_SCRIPT_MAX_CONCURRENCY", "8"))
+script_executor = ThreadPoolExecutor(max_workers=PODCAST_SCRIPT_MAX_CONCURRENCY, thread_name_prefix="podcast-script")
 
 # Define a simple Q&A format using Pydantic
 class QAFormat(BaseModel):
     question: str = Field(..., description="Generated question")
     answer: str = Field(..., description="Generated answer")
 
+def is_retryable_groq_error(error):
+    """Timeouts, dropped connections, rate limits and server errors may succeed on retry; bad requests never do."""
+    import groq
+
+    if isinstance(error, groq.APIConnectionError):  # includes APITimeoutError
+        return True
+    return isinstance(error, groq.APIStatusError) and (error.status_code == 429 or error.status_code >= 500)
+
+def groq_completion(prompt, temperature):
+    """Runs one Groq chat completion with a timeout, retrying transient failures with backoff.
+
+    The SDK's own retries are disabled so ``PODCAST_SCRIPT_RETRIES`` bounds the total attempts.
+    """
+    client = get_groq_client().with_options(max_retries=0)
+    for attempt in range(PODCAST_SCRIPT_RETRIES + 1):
+        try:
+            return client.chat.completions.create(
+                model=PODCAST_SCRIPT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                timeout=PODCAST_SCRIPT_TIMEOUT,
+            ).choices[0].message.content
+        except Exception as e:
+            if attempt == PODCAST_SCRIPT_RETRIES or not is_retryable_groq_error(e):
+                raise
+            print(f"Groq completion failed (attempt {attempt + 1}), retrying: {e}")
+            time.sleep(PODCAST_SCRIPT_BACKOFF * 2 ** attempt)
+
+def parse_qa_pairs(qa_content):
+    """Parses "Question: ...\nAnswer: ..." blocks into QAFormat pairs."""
+    qa_pairs = []
+    for qa in qa_content.split("\n\n"):
+        lines = qa.split("\n")
+        if len(lines) >= 2:
+            question = lines[0].replace("Question: ", "").strip()
+            answer = lines[1].replace("Answer: ", "").strip()
+            qa_pairs.append(QAFormat(question=question, answer=answer))
+    return qa_pairs
+
+def split_text_evenly(text, parts):
+    """Splits text into disjoint, roughly equal slices, preferring paragraph breaks."""
+    slices, start = [], 0
+    for i in range(1, parts):
+        target = len(text) * i // parts
+        cut = text.rfind("\n\n", start, target)
+        cut = cut if cut > start else target
+        slices.append(text[start:cut])
+        start = cut
+    slices.append(text[start:])
+    return [piece for piece in slices if piece.strip()]
+
+def qa_prompt(text, num_questions, section=None):
+    scope = f"this section ({section}) of a research paper" if section else "this research paper"
+    return f"""Generate {num_questions} podcast-style Q&A pairs from {scope}. Follow these rules:
+    1. Questions should be curious and engaging
+    2. Answers should be concise (1-2 short paragraphs)
+    3. Use everyday language and examples
+    4. Maintain natural flow between questions
+    5. Format EXACTLY as: Question: [text]\nAnswer: [text]
+    
+    Paper content: {text}"""
+
 def generate_podcast_content(text, podcast_duration):
-    """Generates intro, Q&A pairs, and outro using Groq API."""
+    """Generates intro, Q&A pairs, and outro using Groq API.
+
+    The completions are independent and run concurrently; long podcasts split
+    the Q&A into parallel requests over disjoint slices of the paper.
+    """
     # Calculate number of questions based on duration (2 minutes per Q&A pair)
     num_questions = max(1, int(podcast_duration // 2))
     
@@ -243,36 +753,15 @@ def generate_podcast_content(text, podcast_duration):
     2. Brief context about the research topic
     3. What listeners can expect
     Keep it conversational and under 4 sentences. Paper content: {text[:1000]}"""
-    
-    intro = groq_client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": intro_prompt}],
-        temperature=0.7,
-    ).choices[0].message.content
-
-    # Generate Q&A Pairs
-    qa_prompt = f"""Generate {num_questions} podcast-style Q&A pairs from this research paper. Follow these rules:
-    1. Questions should be curious and engaging
-    2. Answers should be concise (1-2 short paragraphs)
-    3. Use everyday language and examples
-    4. Maintain natural flow between questions
-    5. Format EXACTLY as: Question: [text]\nAnswer: [text]
-    
-    Paper content: {text}"""
-    
-    qa_content = groq_client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": qa_prompt}],
-        temperature=0.8,
-    ).choices[0].message.content
 
-    qa_pairs = []
-    for qa in qa_content.split("\n\n"):
-        lines = qa.split("\n")
-        if len(lines) >= 2:
-            question = lines[0].replace("Question: ", "").strip()
-            answer = lines[1].replace("Answer: ", "").strip()
-            qa_pairs.append(QAFormat(question=question, answer=answer))
+    # Generate Q&A Pairs, a few questions per request over consecutive slices of the paper
+    num_slices = min(-(-num_questions // PODCAST_QUESTIONS_PER_REQUEST), max(1, len(text) // 1000))
+    slices = split_text_evenly(text, num_slices) if num_slices > 1 else [text]
+    qa_prompts = [
+        qa_prompt(piece, num_questions // len(slices) + (i < num_questions % len(slices)),
+                  f"part {i + 1} of {len(slices)}" if len(slices) > 1 else None)
+        for i, piece in enumerate(slices)
+    ]
 
     # Generate Outro
     outro_prompt = f"""Create a podcast closing segment that includes:
@@ -280,80 +769,84 @@ def generate_podcast_content(text, podcast_duration):
     2. Key takeaway
     3. Call to engage (e.g., follow for more content)
     Keep it under 3 sentences and conversational."""
-    
-    outro = groq_client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[{"role": "user", "content": outro_prompt}],
-        temperature=0.7,
-    ).choices[0].message.content
+
+    intro_future = script_executor.submit(groq_completion, intro_prompt, 0.7)
+    qa_futures = [script_executor.submit(groq_completion, prompt, 0.8) for prompt in qa_prompts]
+    outro_future = script_executor.submit(groq_completion, outro_prompt, 0.7)
+
+    intro = intro_future.result()
+    qa_pairs = [pair for future in qa_futures for pair in parse_qa_pairs(future.result())]
+    outro = outro_future.result()
     print(intro, qa_pairs, outro)
     return intro, qa_pairs, outro
 
-def text_to_speech(intro, qa_pairs, outro, output_filename="podcast.mp3"):
-    """Converts text segments into podcast audio."""
-    audio_segments = []
-    
-    # Generate Introduction
-    intro_audio = elevenlabs_client.generate(
-        text=intro,
-        voice="Rachel",
-        model="eleven_multilingual_v2"
+def podcast_script(intro, qa_pairs, outro):
+    """Lays the podcast out as (text, voice) lines in playback order."""
+    script = [(intro, HOST_VOICE)]
+    for qa in qa_pairs:
+        script.append((qa.question, HOST_VOICE))
+        script.append((qa.answer, GUEST_VOICE))
+    script.append((outro, HOST_VOICE))
+    return script
+
+def synthesize_segment(text, voice):
+    """Synthesises one script line into MP3 bytes, from the TTS cache when possible."""
+    audio = tts_cache.get(text, voice, TTS_MODEL, TTS_OUTPUT_FORMAT)
+    if audio is not None:
+        return audio
+    audio = get_elevenlabs_client().generate(
+        text=text, voice=voice, model=TTS_MODEL, output_format=TTS_OUTPUT_FORMAT
     )
-    save(intro_audio, "temp_intro.mp3")
-    audio_segments.append(AudioSegment.from_mp3("temp_intro.mp3"))
-    
-    # Generate Q&A
-    for idx, qa in enumerate(qa_pairs):
-        q_audio = elevenlabs_client.generate(
-            text=qa.question,
-            voice="Rachel",
-            model="eleven_multilingual_v2"
-        )
-        a_audio = elevenlabs_client.generate(
-            text=qa.answer,
-            voice="Adam",
-            model="eleven_multilingual_v2"
-        )        
-        save(q_audio, f"temp_q{idx}.mp3")
-        save(a_audio, f"temp_a{idx}.mp3")
-        
-        q_segment = AudioSegment.from_mp3(f"temp_q{idx}.mp3")
-        a_segment = AudioSegment.from_mp3(f"temp_a{idx}.mp3")
-        silence = AudioSegment.silent(duration=800)
-        audio_segments.append(q_segment + silence + a_segment + silence)
-        
-        os.remove(f"temp_q{idx}.mp3")
-        os.remove(f"temp_a{idx}.mp3")
-
-    # Generate Outro
-    outro_audio = elevenlabs_client.generate(
-        text=outro,
-        voice="Rachel",
-        model="eleven_multilingual_v2"
-    )
-    save(outro_audio, "temp_outro.mp3")
-    audio_segments.append(AudioSegment.from_mp3("temp_outro.mp3"))
-    
-    # Combine all segments
-    podcast_audio = sum(audio_segments)
-    podcast_audio.export(output_filename, format="mp3")
-    
-    # Cleanup temp files
-    os.remove("temp_intro.mp3")
-    os.remove("temp_outro.mp3")
-    
-    return output_filename
+    audio = audio if isinstance(audio, bytes) else b"".join(audio)
+    tts_cache.put(text, voice, TTS_MODEL, audio, TTS_OUTPUT_FORMAT)
+    return audio
+
+def conform_segment(audio, frame_format):
+    """Re-encodes a segment to the episode's MP3 format; only needed if the TTS output format changes."""
+    segment = AudioSegment.from_file(io.BytesIO(audio), format="mp3")
+    segment = segment.set_frame_rate(frame_format[1]).set_channels(1 if frame_format[2] else 2)
+    output = io.BytesIO()
+    segment.export(output, format="mp3", bitrate=f"{bitrate_kbps(frame_format)}k")
+    return output.getvalue()
+
+def text_to_speech(intro, qa_pairs, outro):
+    """Yields the podcast as MP3 bytes, each script line as soon as it and those before it are ready.
+
+    Lines are synthesised concurrently and joined frame by frame, without
+    decoding or re-encoding, with pre-encoded silence between them.
+    """
+    script = podcast_script(intro, qa_pairs, outro)
+    futures = [tts_executor.submit(synthesize_segment, text, voice) for text, voice in script]
+    try:
+        episode_format, silence = None, b""
+        for position, future in enumerate(futures):
+            audio = future.result()
+            segment_format, frames = split_frames(audio)
+            if episode_format is None:
+                episode_format = segment_format
+                silence = silence_frames(episode_format, PODCAST_PAUSE_MS)
+            elif not same_stream_format(episode_format, segment_format):
+                _, frames = split_frames(conform_segment(audio, episode_format))
+            yield frames
+            # A pause follows every question and answer
+            if 0 < position < len(futures) - 1:
+                yield silence
+    finally:
+        # Stop pending synthesis if the client went away
+        for future in futures:
+            future.cancel()
 
 
 @chat_routes.route("/generate_podcast", methods=["POST"])
 def generate_podcast():
     """Generates a podcast from the uploaded research paper."""
-    if not ensure_pdf_processed():
-        return jsonify({"error": "No PDF uploaded. Upload a file first."}), 400
+    document, error = load_requested_document()
+    if error:
+        return error
 
     try:
         # Extract and limit text
-        text = extract_text_from_pdf(pdf_path)[:7000]
+        text = extract_text_from_pdf(document_store.pdf_path(document.doc_id))[:7000]
         if not text:
             return jsonify({"error": "Failed to extract text from PDF"}), 500
 
@@ -364,14 +857,21 @@ def generate_podcast():
         # Generate content
         intro, qa_pairs, outro = generate_podcast_content(text, podcast_duration)
 
-        # Generate audio
-        audio_io = text_to_speech(intro, qa_pairs, outro)
-
-        return send_file(
-            audio_io,
-            mimetype="audio/mp3",
-            as_attachment=True,
-            download_name="research_podcast.mp3"
+        # Generate audio; waiting for the intro first lets synthesis errors still return JSON
+        audio = text_to_speech(intro, qa_pairs, outro)
+        first_segment = next(audio)
+
+        def generate():
+            yield first_segment
+            try:
+                yield from audio
+            except Exception as e:
+                print(f"Podcast streaming failed: {e}")
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="audio/mpeg",
+            headers={"Content-Disposition": 'attachment; filename="research_podcast.mp3"'},
         )
     except Exception as e:
         # Log the full error for server-side debugging
@@ -1,39 +1,113 @@
 from flask import Blueprint, request, jsonify, send_file
 import networkx as nx
-import pandas as pd
 import numpy as np
 import arxiv
-from pyvis.network import Network
-from yake import KeywordExtractor
 from community import best_partition
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import os
+import re
+import glob
 import json
+import itertools
+import threading
+from collections import OrderedDict
+from app.registry import get_embedding_model, get_keyword_extractor
+from app.paper_store import PaperStore
+from app.graph_workspaces import GraphWorkspaces
+from app.graph_layout import LAYOUT_ITERATIONS, LAYOUT_REFINE_ITERATIONS, apply_layout, force_directed_layout
 
 graph_bp = Blueprint("graph", __name__)
 
-# Initialize models
-kw_extractor = KeywordExtractor(lan="en", top=5)
-embedder = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+# The keyword extractor and embedding model are loaded on first use through
+# app.registry; the embedding model is shared with the chat blueprint.
+# pandas, pyvis and scikit-learn are imported where used to keep start-up fast.
 
 # Define the static folder to store generated graphs
 STATIC_FOLDER = os.path.join(os.path.dirname(__file__), "..", "static")
 os.makedirs(STATIC_FOLDER, exist_ok=True)  # Ensure directory exists
+# Workspace files are named graph_<workspace id>_<pid>_<n>: every process and every
+# rebuilt graph writes its own files, so evicting one never deletes another's
+GRAPH_FILE_PATTERN = re.compile(r"graph_[0-9a-f]+_(\d+)_\d+")
+_graph_file_counter = itertools.count()
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def remove_stale_graph_files():
+    """Delete workspace files written by processes that are no longer running"""
+    for path in glob.glob(os.path.join(STATIC_FOLDER, "graph_*")):
+        match = GRAPH_FILE_PATTERN.match(os.path.basename(path))
+        if match and _process_alive(int(match.group(1))):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+# Embeddings of recently requested recommendation queries
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+_query_embeddings = OrderedDict()
+_query_embeddings_lock = threading.Lock()
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12, None)
+
+def embed_query_title(title):
+    """Normalised embedding of a recommendation query, cached by its text"""
+    with _query_embeddings_lock:
+        if title in _query_embeddings:
+            _query_embeddings.move_to_end(title)
+            return _query_embeddings[title]
+    vector = normalize_rows(get_embedding_model().encode([title], convert_to_numpy=True))[0]
+    with _query_embeddings_lock:
+        _query_embeddings[title] = vector
+        if len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embeddings.popitem(last=False)
+    return vector
+
+# Every paper fetched from arXiv, searchable locally so repeat and overlapping queries skip the network
+paper_store = PaperStore()
 
 class ResearchKnowledgeGraph:
-    def __init__(self):
+    def __init__(self, name="graph"):
+        # Prefix of the files this graph writes to the static folder
+        self.name = name
         self.graph = nx.Graph()
         self.papers = []
+        # L2-normalised title+abstract embeddings of the paper nodes, row i for paper_titles[i]
+        self.paper_titles = []
+        self.paper_rows = {}
+        self.paper_embeddings = None
+        # Bumped whenever the graph changes; the layout is cached per version
+        self.version = 0
+        self._layout = None
+        # Held while the graph is grown, and while it is read for rendering or exports
+        self.lock = threading.RLock()
 
     def fetch_papers(self, query="Artificial Intelligence", max_results=10):
+        """Fetch papers from the local paper store, topped up from arXiv when it has too few"""
+        papers = paper_store.search(query, max_results)
+        if len(papers) < max_results:
+            fetched = self.fetch_papers_arxiv(query, max_results)
+            paper_store.upsert(fetched)
+            known = {paper["link"] for paper in papers}
+            papers += [paper for paper in fetched if paper["link"] not in known][:max_results - len(papers)]
+        self.papers = papers
+
+    def fetch_papers_arxiv(self, query, max_results):
         """Fetch papers from arXiv with metadata"""
         search = arxiv.Search(
             query=query,
             max_results=max_results,
             sort_by=arxiv.SortCriterion.Relevance
         )
-        self.papers = [
+        return [
             {
                 "title": result.title,
                 "authors": [author.name for author in result.authors],
@@ -47,44 +121,109 @@ class ResearchKnowledgeGraph:
 
     def extract_keyphrases(self, text):
         """Extract keyphrases using YAKE"""
-        keywords = kw_extractor.extract_keywords(text)
+        keywords = get_keyword_extractor().extract_keywords(text)
         return [kw[0] for kw in keywords]
 
-    def build_graph(self):
-        """Build the knowledge graph with communities and centrality"""
-        self.graph.clear()
+    def build_graph(self, incremental=False):
+        """Build the knowledge graph with communities and centrality
+
+        In incremental mode only papers not yet in the graph are added: their
+        keyphrases are the only ones extracted, degrees are updated for the
+        nodes they touch and Louvain starts from the previous partition.
+        Degree centrality is derived from the stored degrees when read.
+        """
+        if not incremental:
+            self.graph.clear()
+            self.paper_titles, self.paper_rows, self.paper_embeddings = [], {}, None
+            self._layout = None
+        affected = set()
+        added_papers = []
         for paper in self.papers:
             title = paper["title"]
+            if title in self.paper_rows or any(title == added["title"] for added in added_papers):
+                continue
+            added_papers.append(paper)
             self.graph.add_node(title, type="paper", link=paper["link"], 
                               published=paper["published"],
                               categories=paper["categories"])
+            affected.add(title)
 
             # Authors
             for author in paper["authors"]:
-                self.graph.add_node(author, type="author")
+                if author not in self.graph:
+                    self.graph.add_node(author, type="author")
                 self.graph.add_edge(author, title, relationship="wrote")
+                affected.add(author)
 
             # Keyphrases
             keywords = self.extract_keyphrases(paper["summary"])
             for keyword in keywords:
-                self.graph.add_node(keyword, type="keyword")
+                if keyword not in self.graph:
+                    self.graph.add_node(keyword, type="keyword")
                 self.graph.add_edge(title, keyword, relationship="has_keyword")
+                affected.add(keyword)
+
+        if incremental and not affected:
+            return
+        self.version += 1
+        self.add_paper_embeddings(added_papers)
 
         # Add communities
-        partition = best_partition(self.graph)
+        partition = best_partition(self.graph, partition=self.seed_partition() if incremental else None)
         nx.set_node_attributes(self.graph, partition, "community")
 
-        # Add centrality
-        centrality = nx.degree_centrality(self.graph)
-        nx.set_node_attributes(self.graph, centrality, "centrality")
-
-    def visualize_graph(self):
-        """Generate an interactive PyVis graph with double-click redirection"""
+        # Store raw degrees; only nodes that gained edges change
+        for node in (affected if incremental else self.graph.nodes()):
+            self.graph.nodes[node]["degree"] = self.graph.degree(node)
+
+    def seed_partition(self):
+        """Previous communities, with each new node joining the community of an existing neighbour"""
+        partition = nx.get_node_attributes(self.graph, "community")
+        next_community = max(partition.values(), default=-1) + 1
+        for node in self.graph.nodes():
+            if node in partition:
+                continue
+            seeded = [partition[n] for n in self.graph.neighbors(node) if n in partition]
+            if seeded:
+                partition[node] = max(set(seeded), key=seeded.count)
+            else:
+                partition[node] = next_community
+                next_community += 1
+        return partition
+
+    def centrality(self, node=None):
+        """Degree centrality of one node, or of every node as a dict, from the stored degrees"""
+        scale = 1.0 / (self.graph.number_of_nodes() - 1) if self.graph.number_of_nodes() > 1 else 1.0
+        if node is not None:
+            return self.graph.nodes[node].get("degree", 0) * scale
+        return {n: data.get("degree", 0) * scale for n, data in self.graph.nodes(data=True)}
+
+    def export_view(self):
+        """Copy of the graph with degree centrality filled in, for exports"""
+        graph = self.graph.copy()
+        nx.set_node_attributes(graph, self.centrality(), "centrality")
+        return graph
+
+    def layout(self):
+        """Node positions for the current graph version, refined from the previous layout after growth"""
+        if self._layout is None or self._layout[0] != self.version:
+            previous = self._layout[1] if self._layout else None
+            iterations = LAYOUT_REFINE_ITERATIONS if previous else LAYOUT_ITERATIONS
+            self._layout = (self.version, force_directed_layout(self.graph, iterations, initial=previous))
+        return self._layout[1]
+
+    def visualize_graph(self, physics=False):
+        """Generate an interactive PyVis graph with double-click redirection
+
+        Node positions are precomputed on the server and physics is disabled,
+        unless ``physics`` asks for a short refinement in the browser.
+        """
         if not self.graph or len(self.graph.nodes()) == 0:
             return None
 
+        from pyvis.network import Network
+
         net = Network(notebook=False, height="800px", width="100%", directed=False)
-        net.force_atlas_2based()
 
         # Add nodes with metadata
         for node, data in self.graph.nodes(data=True):
@@ -97,8 +236,10 @@ class ResearchKnowledgeGraph:
         for source, target, data in self.graph.edges(data=True):
             net.add_edge(source, target, title=data["relationship"])
 
+        apply_layout(net, self.layout(), physics=physics)
+
         # Save the graph to a file
-        graph_path = os.path.join(STATIC_FOLDER, "graph.html")
+        graph_path = self.visualization_path(physics)
         net.save_graph(graph_path)
 
         # Inject JavaScript for double-click redirection
@@ -129,20 +270,36 @@ class ResearchKnowledgeGraph:
 
         return graph_path
 
+    def add_paper_embeddings(self, papers):
+        """Append normalised title+abstract embeddings of newly added papers to the matrix"""
+        if not papers:
+            return
+        texts = [f"{paper['title']}. {paper['summary']}" for paper in papers]
+        vectors = normalize_rows(get_embedding_model().encode(texts, convert_to_numpy=True))
+        for paper in papers:
+            self.paper_rows[paper["title"]] = len(self.paper_titles)
+            self.paper_titles.append(paper["title"])
+        if self.paper_embeddings is None:
+            self.paper_embeddings = vectors
+        else:
+            self.paper_embeddings = np.vstack([self.paper_embeddings, vectors])
+
     def recommend_papers(self, paper_title, top_n=5):
         """Recommend similar papers using content similarity"""
-        titles = [node for node, data in self.graph.nodes(data=True) if data["type"] == "paper"]
+        titles = self.paper_titles
 
         if not titles:
             return jsonify({"error": "No papers in the graph"})
 
-        embeddings = embedder.encode(titles, convert_to_numpy=True)
-
         try:
-            query_embedding = embedder.encode([paper_title], convert_to_numpy=True)
-            similarities = cosine_similarity(query_embedding, embeddings)[0]
-
-            top_indices = np.argsort(similarities)[-top_n:][::-1]
+            # A paper in the graph is compared by its stored title+abstract vector
+            row = self.paper_rows.get(paper_title)
+            query_embedding = self.paper_embeddings[row] if row is not None else embed_query_title(paper_title)
+            similarities = self.paper_embeddings @ query_embedding
+
+            top_n = max(1, min(int(top_n), len(titles)))
+            top_indices = np.argpartition(-similarities, top_n - 1)[:top_n]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
             recommendations = []
 
             for i in top_indices:
@@ -169,24 +326,65 @@ class ResearchKnowledgeGraph:
         if not self.graph or len(self.graph.nodes()) == 0:
             return None
             
-        export_path = os.path.join(STATIC_FOLDER, f"graph.{format}")
+        export_path = os.path.join(STATIC_FOLDER, f"{self.name}.{format}")
+        graph = self.export_view()
 
         if format == "gexf":
-            nx.write_gexf(self.graph, export_path)
+            nx.write_gexf(graph, export_path)
         elif format == "graphml":
-            nx.write_graphml(self.graph, export_path)
+            nx.write_graphml(graph, export_path)
         elif format == "csv":
-            nodes_df = pd.DataFrame.from_dict(dict(self.graph.nodes(data=True)), orient='index')
-            edges_df = pd.DataFrame([(u, v, d) for u, v, d in self.graph.edges(data=True)], 
+            import pandas as pd
+
+            nodes_df = pd.DataFrame.from_dict(dict(graph.nodes(data=True)), orient='index')
+            edges_df = pd.DataFrame([(u, v, d) for u, v, d in graph.edges(data=True)], 
                                   columns=['source', 'target', 'attributes'])
             
-            nodes_df.to_csv(os.path.join(STATIC_FOLDER, "nodes.csv"))
-            edges_df.to_csv(os.path.join(STATIC_FOLDER, "edges.csv"))
-            return os.path.join(STATIC_FOLDER, "nodes.csv")
+            nodes_df.to_csv(os.path.join(STATIC_FOLDER, f"{self.name}_nodes.csv"))
+            edges_df.to_csv(os.path.join(STATIC_FOLDER, f"{self.name}_edges.csv"))
+            return os.path.join(STATIC_FOLDER, f"{self.name}_nodes.csv")
 
         return export_path
 
-kg = ResearchKnowledgeGraph()
+    def visualization_path(self, physics=False):
+        return os.path.join(STATIC_FOLDER, f"{self.name}{'_physics' if physics else ''}.html")
+
+    def remove_files(self):
+        """Delete the visualization and exports written for this graph"""
+        for suffix in (".html", "_physics.html", ".gexf", ".graphml", "_nodes.csv", "_edges.csv"):
+            path = os.path.join(STATIC_FOLDER, self.name + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+def build_workspace(workspace_id, steps):
+    """Build a workspace graph by replaying its (query, max_results) steps"""
+    kg = ResearchKnowledgeGraph(name=f"graph_{workspace_id}_{os.getpid()}_{next(_graph_file_counter)}")
+    for position, (query, max_results) in enumerate(steps):
+        kg.fetch_papers(query, max_results)
+        kg.build_graph(incremental=position > 0)
+    return kg
+
+# One graph per normalized query and max_results, evicted by size and rebuilt on demand
+def remove_evicted_files(kg):
+    """Delete an evicted graph's files once requests still reading them are done"""
+    with kg.lock:
+        kg.remove_files()
+
+workspaces = GraphWorkspaces(build_workspace, on_evict=remove_evicted_files)
+
+def requested_workspace():
+    """Resolve the request's workspace_id (or the latest workspace) to its graph.
+
+    Returns ``(kg, None)`` or ``(None, error response)``.
+    """
+    data = request.get_json(silent=True) or {}
+    workspace_id = data.get("workspace_id") or request.args.get("workspace_id")
+    kg = workspaces.get(workspace_id)
+    if kg is None:
+        if workspace_id:
+            return None, (jsonify({"error": f"Unknown workspace '{workspace_id}'. Generate the graph first."}), 404)
+        return None, (jsonify({"error": "No graph data available. Generate a graph first."}), 404)
+    return kg, None
 
 @graph_bp.route("/generate", methods=["POST"])
 def generate_graph():
@@ -194,36 +392,70 @@ def generate_graph():
     data = request.json
     query = data.get("query", "Artificial Intelligence")
     max_results = data.get("max_results", 10)
-
-    kg.fetch_papers(query, max_results)
-    kg.build_graph()
+    try:
+        # bool is an int subclass but never a meaningful result count
+        if isinstance(max_results, bool) or not isinstance(max_results, (int, str)):
+            raise ValueError(max_results)
+        max_results = int(max_results)
+        if max_results < 1:
+            raise ValueError(max_results)
+    except ValueError:
+        return jsonify({"error": "max_results must be a positive integer."}), 400
+    # Grow an existing workspace with the new papers instead of building a new one
+    incremental = bool(data.get("incremental", False) and data.get("workspace_id"))
+
+    if incremental:
+        workspace_id = data["workspace_id"]
+
+        def grow(kg):
+            kg.fetch_papers(query, max_results)
+            kg.build_graph(incremental=True)
+
+        kg = workspaces.extend(workspace_id, query, max_results, grow)
+        if kg is None:
+            return jsonify({"error": f"Unknown workspace '{workspace_id}'. Generate the graph first."}), 404
+    else:
+        workspace_id, kg = workspaces.create(query, max_results)
     
     # Generate the visualization file immediately after building the graph
-    graph_file = kg.visualize_graph()
+    with kg.lock:
+        graph_file = kg.visualization_path()
+        if incremental or not os.path.exists(graph_file):
+            # A browser-refined variant of the previous graph version is stale now
+            if os.path.exists(kg.visualization_path(physics=True)):
+                os.remove(kg.visualization_path(physics=True))
+            graph_file = kg.visualize_graph()
+            # Export in default format
+            kg.export_graph()
     
     if not graph_file:
         return jsonify({"error": "Failed to create graph visualization"}), 500
-        
-    # Export in default format
-    kg.export_graph()
     
     return jsonify({
         "message": "Graph successfully generated",
+        "workspace_id": workspace_id,
         "visualization_path": graph_file
     })
 
 @graph_bp.route("/visualize", methods=["GET"])
 def visualize_graph():
     """Return the PyVis graph visualization with double-click redirection"""
-    graph_file = os.path.join(STATIC_FOLDER, "graph.html")
-
-    if not os.path.exists(graph_file):
-        # Try to generate if it doesn't exist
-        graph_file = kg.visualize_graph()
-        if not graph_file:
-            return jsonify({"error": "Graph not found. Please generate the graph first."}), 404
-
-    return send_file(graph_file)
+    kg, error = requested_workspace()
+    if error:
+        return error
+    # ?physics=1 lets the browser briefly refine the precomputed layout
+    physics = request.args.get("physics", "").lower() in ("1", "true", "yes")
+    with kg.lock:
+        graph_file = kg.visualization_path(physics)
+
+        if not os.path.exists(graph_file):
+            # Try to generate if it doesn't exist
+            graph_file = kg.visualize_graph(physics)
+            if not graph_file:
+                return jsonify({"error": "Graph not found. Please generate the graph first."}), 404
+
+        # Open the file while holding the lock so an eviction cannot delete it first
+        return send_file(open(graph_file, "rb"), download_name=os.path.basename(graph_file))
 
 @graph_bp.route("/recommend", methods=["POST"])
 def recommend_papers():
@@ -235,43 +467,61 @@ def recommend_papers():
     if not paper_title:
         return jsonify({"error": "Paper title is required"}), 400
 
-    return kg.recommend_papers(paper_title, top_n)
+    kg, error = requested_workspace()
+    if error:
+        return error
+    with kg.lock:
+        return kg.recommend_papers(paper_title, top_n)
 
 
 @graph_bp.route("/export", methods=["GET"])
 def export_graph():
     """Export graph in specified format"""
     format = request.args.get("format", "gexf")
+    kg, error = requested_workspace()
+    if error:
+        return error
     
     # Generate the export file
-    export_file = kg.export_graph(format)
+    with kg.lock:
+        export_file = kg.export_graph(format)
     
-    if not export_file:
-        return jsonify({"error": "No graph data to export. Generate a graph first."}), 404
+        if not export_file:
+            return jsonify({"error": "No graph data to export. Generate a graph first."}), 404
     
-    file_path = export_file
+        file_path = export_file
     
-    if not os.path.exists(file_path):
-        return jsonify({"error": f"Export file not found. Try exporting in {format} format first."}), 404
+        if not os.path.exists(file_path):
+            return jsonify({"error": f"Export file not found. Try exporting in {format} format first."}), 404
 
-    return send_file(file_path, as_attachment=True)
+        # Open the file while holding the lock so an eviction cannot delete it first
+        return send_file(open(file_path, "rb"), as_attachment=True, download_name=os.path.basename(file_path))
 
 @graph_bp.route("/papers", methods=["GET"])
 def get_papers():
     """Return a list of papers in the graph"""
+    kg, error = requested_workspace()
+    if error:
+        return error
     if not kg.graph or len(kg.graph.nodes()) == 0:
         return jsonify({"error": "No graph data available. Generate a graph first."}), 404
 
     # Extract paper nodes and their metadata
     papers = []
-    for node, data in kg.graph.nodes(data=True):
-        if data["type"] == "paper":
-            papers.append({
-                "title": node,
-                "link": data.get("link", None),
-                "published": data.get("published", None),
-                "categories": data.get("categories", None),
-                "authors": list(kg.graph.neighbors(node))  # Get authors connected to the paper
-            })
-
-    return jsonify({"papers": papers})
\ No newline at end of file
+    with kg.lock:
+        for node, data in kg.graph.nodes(data=True):
+            if data["type"] == "paper":
+                papers.append({
+                    "title": node,
+                    "link": data.get("link", None),
+                    "published": data.get("published", None),
+                    "categories": data.get("categories", None),
+                    "authors": list(kg.graph.neighbors(node))  # Get authors connected to the paper
+                })
+
+    return jsonify({"papers": papers})
+
+@graph_bp.route("/workspaces", methods=["GET"])
+def workspace_stats():
+    """Number and total size of the graph workspaces held in memory"""
+    return jsonify(workspaces.stats())
\ No newline at end of file
@@ -0,0 +1,75 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class SQLiteLRU:
+    """SQLite table of ``key -> value columns`` evicted in least recently used order.
+
+    Backs the on-disk caches (embeddings, summaries, TTS segments) that every
+    worker process shares. Writes run in ``BEGIN IMMEDIATE`` transactions, so
+    the size checks made while evicting see the inserts of all processes.
+    """
+
+    def __init__(self, path, table, columns):
+        self.path = path
+        self.table = table
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly by write()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"key TEXT PRIMARY KEY, {columns}, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+
+    @contextmanager
+    def read(self):
+        """Yields the connection for single statements that need no transaction."""
+        with self._lock:
+            yield self._conn
+
+    @contextmanager
+    def write(self):
+        """Yields the connection inside a transaction holding the database's write lock."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def touch(self, conn, keys):
+        """Marks the keys as just used; call inside ``write()``."""
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            conn.execute(f"UPDATE {self.table} SET last_used = ? WHERE key IN ({placeholders})", [time.time(), *keys])
+
+    def evict_to_count(self, conn, max_entries):
+        """Deletes the least recently used rows beyond ``max_entries``; call inside ``write()``."""
+        count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > max_entries:
+            conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY last_used LIMIT ?)",
+                (count - max_entries,)
+            )
+
+    def evict_to_total(self, conn, column, max_total):
+        """Deletes least recently used rows until ``SUM(column)`` fits in ``max_total``; call inside ``write()``."""
+        excess = conn.execute(f"SELECT COALESCE(SUM({column}), 0) FROM {self.table}").fetchone()[0] - max_total
+        if excess <= 0:
+            return
+        victims = []
+        for key, size in conn.execute(f"SELECT key, {column} FROM {self.table} ORDER BY last_used"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", victims)
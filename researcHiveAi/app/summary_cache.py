@@ -0,0 +1,45 @@
+import os
+import time
+import hashlib
+
+from app.sqlite_lru import SQLiteLRU
+
+SUMMARY_CACHE_PATH = os.getenv(
+    "SUMMARY_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "summary_cache.sqlite3")
+)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "50000"))
+
+
+class SummaryCache:
+    """On-disk LRU cache of partial summaries keyed by the hash of the summarized text.
+
+    Full-document summaries of a paper that was summarized before only pay for
+    the reduce step.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_PATH, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._store = SQLiteLRU(path, "summaries", "summary TEXT NOT NULL")
+
+    @staticmethod
+    def key(namespace, text):
+        return hashlib.sha256(f"{namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, namespace, text):
+        key = self.key(namespace, text)
+        with self._store.read() as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+        if row:
+            with self._store.write() as conn:
+                self._store.touch(conn, [key])
+        return row[0] if row else None
+
+    def put(self, namespace, text, summary):
+        with self._store.write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)",
+                (self.key(namespace, text), summary, time.time())
+            )
+            self._store.evict_to_count(conn, self.max_entries)
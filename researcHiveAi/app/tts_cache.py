@@ -0,0 +1,74 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from app.sqlite_lru import SQLiteLRU
+
+TTS_CACHE_PATH = os.getenv(
+    "TTS_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "data", "tts_cache.sqlite3")
+)
+# Total audio bytes kept before the least recently used segments are evicted
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class TTSCache:
+    """On-disk LRU cache of synthesised speech keyed by the hash of text, voice and model.
+
+    Intros, outros and repeated questions are synthesised once; regenerating a
+    podcast for the same paper costs no text-to-speech calls.
+    """
+
+    def __init__(self, path=TTS_CACHE_PATH, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Guards the hit and miss counters
+        self._lock = threading.Lock()
+        self._store = SQLiteLRU(path, "segments", "audio BLOB NOT NULL, size INTEGER NOT NULL")
+
+    @staticmethod
+    def key(text, voice, model, output_format=""):
+        return hashlib.sha256(f"{model}\0{voice}\0{output_format}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text, voice, model, output_format=""):
+        key = self.key(text, voice, model, output_format)
+        with self._store.read() as conn:
+            row = conn.execute("SELECT audio FROM segments WHERE key = ?", (key,)).fetchone()
+        if row:
+            with self._store.write() as conn:
+                self._store.touch(conn, [key])
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return bytes(row[0]) if row else None
+
+    def put(self, text, voice, model, audio, output_format=""):
+        if len(audio) > self.max_bytes:
+            return
+        key = self.key(text, voice, model, output_format)
+        with self._store.write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(audio), len(audio), time.time())
+            )
+            # The byte total is summed inside the transaction, so it covers every worker's inserts
+            self._store.evict_to_total(conn, "size", self.max_bytes)
+
+    def stats(self):
+        with self._store.read() as conn:
+            entries, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM segments").fetchone()
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": entries,
+                "bytes": total_bytes,
+            }
@@ -0,0 +1,66 @@
+"""Parity and throughput of the embedding backends in app.embeddings.
+
+Encodes the chunks of a PDF (or synthetic sentences) with the PyTorch
+SentenceTransformer, ONNX Runtime fp32 and ONNX Runtime int8, and reports
+sentences per second plus cosine drift and top-k agreement against PyTorch.
+
+Usage (from researcHiveAi/):
+    python -m benchmarks.bench_embedding_backends --pdf uploaded_paper.pdf
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.embeddings import EMBEDDING_BACKENDS, cosine_drift, load_embedding_model
+
+
+def load_corpus(pdf, size):
+    if pdf:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        from app.pdf_extract import extract_pages
+
+        text = "\n\n".join(extract_pages(pdf))
+        chunks = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=200).split_text(text)
+        return chunks[:size] if size else chunks
+    words = "graph neural network attention transformer dataset benchmark accuracy retrieval embedding".split()
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(words, size=rng.integers(8, 120))) for _ in range(size or 512)]
+
+
+def top_k_agreement(reference, candidate, k=5):
+    """Share of each row's k nearest neighbours that both backends agree on."""
+    ref_top = np.argsort(-(reference @ reference.T), axis=1)[:, 1:k + 1]
+    cand_top = np.argsort(-(candidate @ candidate.T), axis=1)[:, 1:k + 1]
+    return np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, cand_top)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf")
+    parser.add_argument("--size", type=int, default=0, help="Number of texts (default: all chunks or 512)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.pdf, args.size)
+    print(f"{len(corpus)} texts\n")
+    print("| backend | texts/s | mean drift | max drift | top-5 agreement |")
+    print("|---|---|---|---|---|")
+
+    reference = None
+    for backend in EMBEDDING_BACKENDS:
+        model = load_embedding_model(backend, device="cpu")
+        model.encode(corpus[:args.batch_size], batch_size=args.batch_size)  # warm-up
+        start = time.perf_counter()
+        vectors = np.asarray(model.encode(corpus, batch_size=args.batch_size), dtype=np.float32)
+        throughput = len(corpus) / (time.perf_counter() - start)
+
+        if reference is None:
+            reference = vectors
+        drift = cosine_drift(reference, vectors)
+        print(f"| {backend} | {throughput:.1f} | {drift.mean():.2e} | {drift.max():.2e} "
+              f"| {top_k_agreement(reference, vectors):.3f} |")
+
+
+if __name__ == "__main__":
+    main()
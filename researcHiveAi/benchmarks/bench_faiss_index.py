@@ -0,0 +1,100 @@
+"""Recall-versus-latency report for the FAISS index types in app.faiss_index.
+
+Builds every index type over a synthetic clustered corpus (or a saved .npy
+embedding matrix) and sweeps nprobe / efSearch. Recall@k is measured against
+exact Flat search.
+
+Usage (from researcHiveAi/):
+    python -m benchmarks.bench_faiss_index --sizes 1000 10000 100000
+    python -m benchmarks.bench_faiss_index --vectors embeddings.npy
+
+Results on a single CPU are kept in benchmarks/results_faiss_index.md.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.faiss_index import INDEX_TYPES, create_index, fallback_index_type, search_params, train_index
+
+NPROBE_SWEEP = [1, 4, 16, 64]
+EF_SEARCH_SWEEP = [16, 32, 64, 128]
+
+
+def clustered_corpus(size, dimension, clusters=64, seed=0):
+    """Gaussian clusters, closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=size)
+    return centers[labels] + 0.3 * rng.normal(size=(size, dimension)).astype(np.float32)
+
+
+def build(index_type, corpus):
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return train_index(index_type, corpus)
+    index = create_index(index_type, corpus.shape[1])
+    index.add(corpus)
+    return index
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def report(corpus, queries, k):
+    exact = build("flat", corpus)
+    _, truth = exact.search(queries, k)
+
+    print(f"\n### {len(corpus)} vectors, d={corpus.shape[1]}, {len(queries)} queries, recall@{k}\n")
+    print("| index | knob | build s | recall | ms/query |")
+    print("|---|---|---|---|---|")
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build(index_type, corpus)
+        build_time = time.perf_counter() - start
+
+        # Trained types fall back to simpler indexes on small corpora
+        built_type = fallback_index_type(index_type, len(corpus)) if index_type in ("ivf_flat", "ivf_pq") else index_type
+        label_type = index_type if built_type == index_type else f"{index_type} (built as {built_type})"
+
+        if built_type in ("ivf_flat", "ivf_pq"):
+            sweep = [(f"nprobe={n}", search_params(index, nprobe=n)) for n in NPROBE_SWEEP]
+        elif index_type == "hnsw":
+            sweep = [(f"efSearch={e}", search_params(index, ef_search=e)) for e in EF_SEARCH_SWEEP]
+        else:
+            sweep = [("-", None)]
+
+        for label, params in sweep:
+            start = time.perf_counter()
+            if params is None:
+                _, found = index.search(queries, k)
+            else:
+                _, found = index.search(queries, k, params=params)
+            per_query = (time.perf_counter() - start) * 1000 / len(queries)
+            print(f"| {label_type} | {label} | {build_time:.2f} | {recall_at_k(found, truth):.3f} | {per_query:.3f} |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--vectors", help="Optional .npy embedding matrix to use instead of synthetic data")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+        rng = np.random.default_rng(1)
+        queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+        report(vectors, queries, args.k)
+        return
+
+    for size in args.sizes:
+        corpus = clustered_corpus(size + args.queries, args.dimension)
+        report(corpus[:size], corpus[size:], args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Benchmark serial vs. parallel PDF page extraction.
+
+Usage (from researcHiveAi/):
+    python -m benchmarks.bench_pdf_extract path/to/thesis.pdf --workers 2 4 8
+"""
+import argparse
+import time
+
+from app.pdf_extract import extract_pages_serial, extract_pages_parallel, page_count
+
+
+def best_of(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", default="uploaded_paper.pdf")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.pdf}: {page_count(args.pdf)} pages")
+    serial_time, serial_pages = best_of(lambda: extract_pages_serial(args.pdf), args.repeat)
+    print(f"{'serial':>12}: {serial_time * 1000:8.1f} ms")
+
+    for workers in args.workers:
+        # Warm the pool once so process start-up is not counted as extraction time
+        extract_pages_parallel(args.pdf, workers)
+        elapsed, pages = best_of(lambda: extract_pages_parallel(args.pdf, workers), args.repeat)
+        assert pages == serial_pages, "parallel extraction changed page order or content"
+        print(f"{f'{workers} workers':>12}: {elapsed * 1000:8.1f} ms  ({serial_time / elapsed:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,6 @@ import requests
 from pyvis.network import Network
 from yake import KeywordExtractor
 from community import best_partition
-from sentence_transformers import SentenceTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 import os
 import streamlit.components.v1 as components
@@ -16,9 +15,18 @@ import igraph as ig
 import cdlib
 from cdlib import algorithms, evaluation
 
+# Server-side layout shared with the Flask backend. The backend root goes first on the
+# path: graph/app.py, next to this script, would otherwise shadow the `app` package.
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.graph_layout import apply_layout, force_directed_layout
+
 # Initialize models
 kw_extractor = KeywordExtractor(lan="en", top=5)
-embedder = SentenceTransformer("all-MiniLM-L6-v2", device="cpu")
+# Same EMBEDDING_BACKEND switch as the Flask backend; "remote" shares the model
+# loaded by app.embedding_server instead of loading a copy per process
+from app.embeddings import load_embedding_model
+embedder = load_embedding_model(device="cpu")
 
 # Create static folder for HTML files
 STATIC_FOLDER = os.path.join(os.path.dirname(__file__), "static")
@@ -34,6 +42,8 @@ class ResearchKnowledgeGraph:
         self.embeddings = None
         self.communities = {}
         self.metrics = {}
+        # Node positions computed on the server, reused by every visualization of the same graph
+        self.layout = None
         
     def fetch_papers_arxiv(self, query, max_results=10):
         try:
@@ -205,6 +215,7 @@ class ResearchKnowledgeGraph:
     def build_graph(self):
         with st.spinner('Building knowledge graph...'):
             self.graph.clear()
+            self.layout = None
             
             for paper in self.papers:
                 title = paper["title"]
@@ -348,7 +359,7 @@ class ResearchKnowledgeGraph:
             
             return metrics
 
-    def visualize_graph(self, algorithm='louvain', physics_enabled=True):
+    def visualize_graph(self, algorithm='louvain', physics_enabled=False):
         if not self.graph.nodes:
             return None
             
@@ -363,35 +374,6 @@ class ResearchKnowledgeGraph:
             # Create the network
             net = Network(notebook=False, height=f"{GRAPH_HEIGHT}px", width="100%", directed=False)
             
-            # Improved physics settings for better initial view
-            if physics_enabled:
-                # This configuration helps with initial zoom and distribution
-                net.barnes_hut(
-                    gravity=-5000,  # Reduced gravity for less compression
-                    central_gravity=0.1,  # Lower central gravity to spread nodes more
-                    spring_length=250,  # Increased spring length for more spacing
-                    spring_strength=0.01,  # Lower spring strength for more even spacing
-                    damping=0.09
-                )
-                
-                # Set initial zoom options
-                net.set_options("""
-                {
-                  "interaction": {
-                    "navigationButtons": true,
-                    "zoomView": true
-                  },
-                  "physics": {
-                    "stabilization": {
-                      "iterations": 100,  
-                      "fit": true           
-                    }
-                  }
-                }
-                """)
-            else:
-                net.toggle_physics(False)
-            
             # Generate colors based on communities
             # Use a different palette for each type of node to distinguish them
             import matplotlib.pyplot as plt
@@ -477,6 +459,11 @@ class ResearchKnowledgeGraph:
                     
                 net.add_edge(source, target, title=data["relationship"], color=edge_color, width=edge_width)
             
+            # Positions are computed once per graph; the browser only refines them if physics is enabled
+            if self.layout is None:
+                self.layout = force_directed_layout(self.graph)
+            apply_layout(net, self.layout, physics=physics_enabled, solver="barnesHut")
+            
             # Save to HTML file
             graph_path = os.path.join(STATIC_FOLDER, f"graph_{algorithm}.html")
             net.save_graph(graph_path)
@@ -515,7 +502,7 @@ with st.sidebar:
         default=["arXiv", "Semantic Scholar"]
     )
     
-    physics_enabled = st.checkbox("Enable Physics (Interactive Movement)", value=True)
+    physics_enabled = st.checkbox("Refine Layout in Browser (Physics)", value=False)
     
     # Community detection algorithm selection
     st.subheader("Community Detection")
@@ -0,0 +1,21 @@
+import pytest
+
+from app.batching import MicroBatcher
+
+
+def test_submit_fails_when_batch_function_drops_results():
+    batcher = MicroBatcher(lambda items: [])
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+
+
+def test_worker_survives_base_exception():
+    def batch_fn(items):
+        if items == ["stop"]:
+            raise SystemExit
+        return items
+
+    batcher = MicroBatcher(batch_fn)
+    with pytest.raises(SystemExit):
+        batcher.submit("stop")
+    assert batcher.submit("next") == "next"
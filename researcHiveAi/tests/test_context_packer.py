@@ -0,0 +1,44 @@
+from app.context_packer import estimate_tokens, pack_context, stitch
+
+
+def test_stitch_removes_splitter_overlap():
+    overlap = "the encoder is pretrained on a large unlabeled corpus"
+    left = "We describe the model. In our setup " + overlap
+    right = overlap + " and then fine-tuned on each task."
+    assert stitch(left, right) == "We describe the model. In our setup " + overlap + " and then fine-tuned on each task."
+
+
+def test_stitch_keeps_text_without_overlap():
+    left = "We ran the experiments on ImageNet"
+    right = "tables show the results"
+    assert stitch(left, right) == left + "\n\n" + right
+
+
+def test_stitch_ignores_overlap_inside_a_word():
+    left = "x" * 10 + " alpha beta gamma delta epsilon zeta eta theta"
+    right = "ta gamma delta epsilon zeta eta theta iota kappa"
+    assert stitch(left, right) == left + "\n\n" + right
+
+
+def _chunks():
+    words = [f"word{i:04d}" for i in range(1500)]
+    # 500-word chunks sharing 20 words (~200 characters) with their neighbours, like the splitter's overlap
+    return [" ".join(words[start:start + 500]) for start in (0, 480, 960)]
+
+
+def test_pack_context_keeps_top_ranked_chunk_whole():
+    chunks = _chunks()
+    budget = estimate_tokens(chunks[2]) + 50
+    sections, stats = pack_context([2, 1], chunks, token_budget=budget)
+    assert sections == [chunks[2]]
+    assert stats["tokens_over_budget"] == estimate_tokens(chunks[1])
+    assert stats["tokens_saved"] == 0
+
+
+def test_pack_context_stitches_kept_neighbours_once():
+    chunks = _chunks()
+    sections, stats = pack_context([1, 2], chunks, token_budget=100000)
+    assert sections == [stitch(chunks[1], chunks[2])]
+    assert stats["tokens_packed"] < stats["tokens_retrieved"]
+    assert stats["tokens_saved"] > 0
+    assert stats["tokens_over_budget"] == 0
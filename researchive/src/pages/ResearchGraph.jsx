@@ -27,6 +27,8 @@ const ResearchGraph = () => {
     const [exportFormat, setExportFormat] = useState("gexf")
     const [graphHtml, setGraphHtml] = useState(null)
     const [availablePapers, setAvailablePapers] = useState([])
+    // Server-side graph workspace returned by /generate
+    const [workspaceId, setWorkspaceId] = useState(null)
 
     // Reference for the iframe
     const iframeRef = useRef(null)
@@ -49,14 +51,16 @@ const ResearchGraph = () => {
                 query,
                 max_results: maxResults,
             })
+            const newWorkspaceId = response.data.workspace_id
+            setWorkspaceId(newWorkspaceId)
             setSuccess("Graph generated successfully!")
             setGraphGenerated(true)
 
             // Load the graph visualization after generation
-            loadGraphVisualization()
+            loadGraphVisualization(newWorkspaceId)
 
             // Fetch available papers for dropdown
-            fetchAvailablePapers()
+            fetchAvailablePapers(newWorkspaceId)
         } catch (err) {
             setError(`Error generating graph: ${err.response?.data?.error || err.message}`)
         } finally {
@@ -65,9 +69,11 @@ const ResearchGraph = () => {
     }
 
     // Fetch available papers from the graph
-    const fetchAvailablePapers = async () => {
+    const fetchAvailablePapers = async (id = workspaceId) => {
         try {
-            const response = await axios.get(`${API_BASE_URL}/api/graph/papers`)
+            const response = await axios.get(`${API_BASE_URL}/api/graph/papers`, {
+                params: { workspace_id: id },
+            })
             if (response.data && response.data.papers) {
                 // Extract just the titles from the paper objects
                 const paperTitles = response.data.papers.map((paper) => paper.title)
@@ -84,10 +90,11 @@ const ResearchGraph = () => {
     }
 
     // Load the graph visualization
-    const loadGraphVisualization = async () => {
+    const loadGraphVisualization = async (id = workspaceId) => {
         try {
             // Fetch the HTML content directly
             const response = await axios.get(`${API_BASE_URL}/api/graph/visualize`, {
+                params: { workspace_id: id },
                 responseType: "text",
                 headers: {
                     Accept: "text/html",
@@ -130,6 +137,7 @@ const ResearchGraph = () => {
             const response = await axios.post(`${API_BASE_URL}/api/graph/recommend`, {
                 title: paperTitle,
                 top_n: 5,
+                workspace_id: workspaceId,
             })
 
             // Check if we received an error message from the backend
@@ -157,10 +165,10 @@ const ResearchGraph = () => {
 
         setLoading(true)
         try {
-            let url = `${API_BASE_URL}/api/graph/visualize`
+            let url = `${API_BASE_URL}/api/graph/visualize?workspace_id=${workspaceId}`
 
             if (type === "export") {
-                url = `${API_BASE_URL}/api/graph/export?format=${exportFormat}`
+                url = `${API_BASE_URL}/api/graph/export?format=${exportFormat}&workspace_id=${workspaceId}`
             }
 
             // This will trigger file download
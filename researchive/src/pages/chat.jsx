@@ -20,6 +20,7 @@ const ResearchAssistant = () => {
   const [activeOperation, setActiveOperation] = useState(null);
   const [pdfUploaded, setPdfUploaded] = useState(false);
   const [pdfName, setPdfName] = useState('');
+  const [documentId, setDocumentId] = useState(null);
   const [uploadStatus, setUploadStatus] = useState({ message: '', isError: false });
   const [summary, setSummary] = useState('');
   const [suggestions, setSuggestions] = useState('');
@@ -38,6 +39,7 @@ const ResearchAssistant = () => {
     // For now, we'll just reset the state
     setPdfUploaded(false);
     setPdfName('');
+    setDocumentId(null);
     setSummary('');
     setSuggestions('');
     setChatHistory([]);
@@ -70,12 +72,26 @@ const ResearchAssistant = () => {
         }
       });
 
+      // Large PDFs are processed in the background; wait for the ingestion job
+      if (response.data.job_id) {
+        let job = { stage: 'queued', percent: 0 };
+        while (job.stage !== 'done') {
+          if (job.stage === 'failed') {
+            throw { response: { data: { error: job.error || 'Failed to process the uploaded PDF' } } };
+          }
+          setUploadStatus({ message: `Processing PDF: ${job.stage} (${job.percent}%)`, isError: false });
+          await new Promise((resolve) => setTimeout(resolve, 1000));
+          job = (await axios.get(`${API_BASE_URL}/chat/refresh/status/${response.data.job_id}`)).data;
+        }
+      }
+
       setUploadStatus({
         message: response.data.message || 'PDF uploaded successfully!',
         isError: false
       });
       setPdfUploaded(true);
       setPdfName(file.name);
+      setDocumentId(response.data.document_id);
 
       // Reset other states when new PDF is uploaded
       setSummary('');
@@ -88,6 +104,7 @@ const ResearchAssistant = () => {
         isError: true
       });
       setPdfUploaded(false);
+      setDocumentId(null);
     } finally {
       setIsLoading(false);
       setActiveOperation(null);
@@ -109,7 +126,8 @@ const ResearchAssistant = () => {
 
     try {
       const response = await axios.post(`${API_BASE_URL}/chat/summarize`, {
-        query: customQuery || 'Summarize the research paper'
+        query: customQuery || 'Summarize the research paper',
+        document_id: documentId
       });
       setSummary(response.data.summary);
     } catch (error) {
@@ -139,7 +157,8 @@ const ResearchAssistant = () => {
 
     try {
       const response = await axios.post(`${API_BASE_URL}/chat/research_suggestions`, {
-        query: customQuery || 'Suggest future research directions'
+        query: customQuery || 'Suggest future research directions',
+        document_id: documentId
       });
       setSuggestions(response.data.research_suggestions);
     } catch (error) {
@@ -170,7 +189,7 @@ const ResearchAssistant = () => {
 
     try {
       const response = await axios.post(`${API_BASE_URL}/chat/generate_podcast`,
-        { duration: podcastDuration },
+        { duration: podcastDuration, document_id: documentId },
         { responseType: 'blob' }
       );
 
@@ -212,7 +231,8 @@ const ResearchAssistant = () => {
 
     try {
       const response = await axios.post(`${API_BASE_URL}/chat/chat`, {
-        query: userQuery
+        query: userQuery,
+        document_id: documentId
       });
 
       const aiResponse = response.data.response;